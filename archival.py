@@ -0,0 +1,56 @@
+from datetime import datetime, timedelta
+from sqlalchemy import DateTime, literal
+from sqlmodel import Session, select, insert, delete
+from config import settings
+from database import engine
+from models import Post, ArchivedPost
+
+# Seuls les posts terminés quittent la table posts : le scheduler et le rattrapage
+# ne lisent que des posts programmés, qui restent toujours dans la table "chaude".
+ARCHIVABLE_STATUSES = ('published', 'failed')
+ARCHIVED_COLUMNS = [column.name for column in Post.__table__.columns]
+
+def archive_horizon() -> datetime:
+    """Aucun post archivé n'a de date de publication postérieure à cet instant."""
+    return datetime.utcnow() - timedelta(days=max(settings.ARCHIVE_AFTER_DAYS, 0))
+
+def archive_old_posts() -> int:
+    """
+    Déplace par lots de ARCHIVE_BATCH_SIZE les posts terminés plus anciens que ARCHIVE_AFTER_DAYS
+    vers posts_archive (copie puis suppression dans la même transaction, un commit par lot).
+    Retourne le nombre de posts archivés.
+    """
+    if settings.ARCHIVE_AFTER_DAYS <= 0:
+        return 0
+
+    cutoff = archive_horizon()
+    archived_count = 0
+    with Session(engine) as session:
+        while True:
+            # Verrouille le lot : un renvoi manuel concurrent ne peut pas le modifier entre la copie et la suppression
+            post_ids = session.exec(
+                select(Post.id)
+                .where(Post.status.in_(ARCHIVABLE_STATUSES), Post.scheduled_at < cutoff)
+                .order_by(Post.scheduled_at)
+                .limit(settings.ARCHIVE_BATCH_SIZE)
+                .with_for_update(skip_locked=True)
+            ).all()
+            if not post_ids:
+                break
+
+            session.exec(
+                insert(ArchivedPost).from_select(
+                    ARCHIVED_COLUMNS + ['archived_at'],
+                    select(
+                        *[Post.__table__.c[name] for name in ARCHIVED_COLUMNS],
+                        literal(datetime.utcnow(), DateTime).label('archived_at'),
+                    ).where(Post.id.in_(post_ids))
+                )
+            )
+            session.exec(delete(Post).where(Post.id.in_(post_ids)))
+            session.commit()
+            archived_count += len(post_ids)
+
+    if archived_count:
+        print(f"Archivage : {archived_count} post(s) déplacé(s) vers posts_archive (avant le {cutoff}).")
+    return archived_count
@@ -4,9 +4,10 @@ from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlmodel import Session, select
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from config import settings
-from database import get_session
+from database import get_async_session, async_session_factory
 from models import User
 
 # --- Configuration ---
@@ -16,6 +17,7 @@ ACCESS_TOKEN_EXPIRE_MINUTES = settings.ACCESS_TOKEN_EXPIRE_MINUTES
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
+oauth2_scheme_optional = OAuth2PasswordBearer(tokenUrl="auth/login", auto_error=False)
 
 # --- Password Utilities ---
 def verify_password(plain_password, hashed_password):
@@ -36,7 +38,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     return encoded_jwt
 
 # --- Dependencies ---
-async def get_current_user(token: str = Depends(oauth2_scheme), session: Session = Depends(get_session)):
+async def _authenticate(token: str, session: AsyncSession) -> User:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -51,7 +53,26 @@ async def get_current_user(token: str = Depends(oauth2_scheme), session: Session
         raise credentials_exception
     
     statement = select(User).where(User.email == email)
-    user = session.exec(statement).first()
+    user = (await session.exec(statement)).first()
     if user is None:
         raise credentials_exception
     return user
+
+async def get_current_user(token: str = Depends(oauth2_scheme), session: AsyncSession = Depends(get_async_session)):
+    return await _authenticate(token, session)
+
+# Routes en streaming (SSE, export) : une session de dépendance peut rester ouverte jusqu'à la fin de la
+# réponse selon la version de FastAPI, et garder une connexion du pool pendant tout le flux.
+# L'utilisateur est donc chargé dans une session courte, fermée avant l'envoi du corps.
+
+async def get_current_user_streaming(token: str = Depends(oauth2_scheme)):
+    async with async_session_factory() as session:
+        return await _authenticate(token, session)
+
+async def get_current_user_for_stream(
+    access_token: Optional[str] = None,
+    token: Optional[str] = Depends(oauth2_scheme_optional)
+):
+    """EventSource (navigateur) ne peut pas envoyer d'en-tête Authorization : le token est aussi accepté dans l'URL."""
+    async with async_session_factory() as session:
+        return await _authenticate(token or access_token or "", session)
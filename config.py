@@ -9,7 +9,56 @@ class Settings:
     SECRET_KEY = os.getenv("SECRET_KEY")
     ALGORITHM = os.getenv("ALGORITHM", "HS256")
     ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
+    # Pool de connexions du moteur asynchrone (Postgres)
+    ASYNC_DB_POOL_SIZE = int(os.getenv("ASYNC_DB_POOL_SIZE", 10))
+    ASYNC_DB_MAX_OVERFLOW = int(os.getenv("ASYNC_DB_MAX_OVERFLOW", 20))
+    IDEMPOTENCY_TTL_HOURS = int(os.getenv("IDEMPOTENCY_TTL_HOURS", 24))
+
+    # Publication par lots (scheduler et rattrapage)
+    DISPATCH_BATCH_SIZE = int(os.getenv("DISPATCH_BATCH_SIZE", 50))
+    DISPATCH_CONCURRENCY = int(os.getenv("DISPATCH_CONCURRENCY", 8))
+    # Au-delà, un post resté 'publishing' est considéré comme interrompu (arrêt pendant l'envoi)
+    PUBLISH_CLAIM_TIMEOUT_MINUTES = int(os.getenv("PUBLISH_CLAIM_TIMEOUT_MINUTES", 10))
+
+    # Pré-vérification des posts PREFLIGHT_LEAD_SECONDS avant leur échéance (0 = désactivée).
+    # Le scan a lieu toutes les PREFLIGHT_SCAN_SECONDS : garder cet intervalle nettement inférieur au délai.
+    PREFLIGHT_LEAD_SECONDS = int(os.getenv("PREFLIGHT_LEAD_SECONDS", 120))
+    PREFLIGHT_SCAN_SECONDS = int(os.getenv("PREFLIGHT_SCAN_SECONDS", 30))
+    PREFLIGHT_IMAGE_TIMEOUT = float(os.getenv("PREFLIGHT_IMAGE_TIMEOUT", 10))
+    # Hôtes dont les images sont vérifiées (https uniquement) : ceux où sont déposées les images
+    PREFLIGHT_IMAGE_HOSTS = [
+        host.strip().lower() for host in os.getenv("PREFLIGHT_IMAGE_HOSTS", "res.cloudinary.com").split(",") if host.strip()
+    ]
+
+    # Archivage des posts publiés / en échec plus anciens que N jours (0 = désactivé)
+    ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", 90))
+    ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", 500))
+
+    # Configuration linguistique Postgres de l'index plein texte (fixée à la création de l'index)
+    SEARCH_LANGUAGE = os.getenv("SEARCH_LANGUAGE", "french")
+
+    # Import de posts (/posts/import) : nombre de lignes insérées par transaction
+    IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", 500))
+    EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", 1000))
+
+    # Flux d'événements temps réel (/posts/events)
+    EVENTS_BUFFER_SIZE = int(os.getenv("EVENTS_BUFFER_SIZE", 1000))
+    EVENTS_QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", 100))
+    EVENTS_HEARTBEAT_SECONDS = float(os.getenv("EVENTS_HEARTBEAT_SECONDS", 15))
+    # Diffusion entre instances via Postgres LISTEN/NOTIFY
+    EVENTS_PG_BRIDGE = os.getenv("EVENTS_PG_BRIDGE", "false").lower() in ("1", "true", "yes")
+
+    # Budget mémoire partagé par les traitements d'images simultanés
+    IMAGE_MEMORY_BUDGET_MB = int(os.getenv("IMAGE_MEMORY_BUDGET_MB", 256))
+    IMAGE_MEMORY_WAIT_SECONDS = float(os.getenv("IMAGE_MEMORY_WAIT_SECONDS", 30))
     
+    # Profilage à la demande (middleware + /debug/profiles), désactivé par défaut
+    PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() in ("1", "true", "yes")
+    PROFILING_TOKEN = os.getenv("PROFILING_TOKEN")  # En-tête X-Profile-Token
+    PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", 0))
+    PROFILING_INTERVAL_MS = float(os.getenv("PROFILING_INTERVAL_MS", 5))
+    PROFILING_HISTORY = int(os.getenv("PROFILING_HISTORY", 50))
+
     # Webhook URLs (can be overridden by env vars, otherwise defaults or empty)
     LINKEDIN_WEBHOOK_URL = os.getenv("LINKEDIN_WEBHOOK_URL", "https://hook.eu2.make.com/y72rxhdivuoq9bfcwd69ztkpeifgn30p")
     INSTAGRAM_WEBHOOK_URL = os.getenv("INSTAGRAM_WEBHOOK_URL", "https://hook.eu1.make.com/0edx1p5aj72cfj61amhu1comfwu9kv9x")
@@ -1,4 +1,7 @@
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlmodel import SQLModel, create_engine, Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 from config import settings
 
 # Use the DATABASE_URL from settings
@@ -12,12 +15,41 @@ if not DATABASE_URL:
 if DATABASE_URL.startswith("postgres://"):
     DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
 
+# Moteur synchrone : scheduler (threads APScheduler), migrations, routes d'envoi (webhooks bloquants)
 engine = create_engine(DATABASE_URL, echo=False)
 
+def _async_engine_config(url: str) -> tuple:
+    """Même base, driver asynchrone : asyncpg pour Postgres, aiosqlite pour le fichier SQLite local."""
+    async_url = make_url(url)
+    connect_args = {}
+    engine_kwargs = {}
+    backend = async_url.get_backend_name()
+    if backend == "postgresql":
+        async_url = async_url.set(drivername="postgresql+asyncpg")
+        # asyncpg ne connaît pas le paramètre libpq "sslmode"
+        sslmode = async_url.query.get("sslmode")
+        if sslmode:
+            async_url = async_url.difference_update_query(["sslmode"])
+            connect_args["ssl"] = sslmode
+        engine_kwargs = {"pool_size": settings.ASYNC_DB_POOL_SIZE, "max_overflow": settings.ASYNC_DB_MAX_OVERFLOW}
+    elif backend == "sqlite":
+        async_url = async_url.set(drivername="sqlite+aiosqlite")
+    return async_url, connect_args, engine_kwargs
+
+# Moteur asynchrone : routes de lecture/écriture du tableau de bord (posts, auth)
+_async_url, _async_connect_args, _async_engine_kwargs = _async_engine_config(DATABASE_URL)
+async_engine = create_async_engine(_async_url, echo=False, connect_args=_async_connect_args, **_async_engine_kwargs)
+# expire_on_commit=False : pas de rechargement implicite (impossible en async) après un commit
+async_session_factory = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+
 def get_session():
     with Session(engine) as session:
         yield session
 
+async def get_async_session():
+    async with async_session_factory() as session:
+        yield session
+
 def init_db():
-    from models import User, Post  # Import models to register them
+    from models import User, Post, PostGroup, PostSeries, ArchivedPost, IdempotencyKey  # Import models to register them
     SQLModel.metadata.create_all(engine)
@@ -0,0 +1,141 @@
+import asyncio
+import json
+import select
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Optional
+from sqlalchemy import text
+from config import settings
+from database import engine
+
+# Bus d'événements en mémoire : le scheduler et les routes d'envoi (threads) publient les
+# changements de statut, les flux SSE (boucle asyncio) les reçoivent. Avec EVENTS_PG_BRIDGE,
+# les événements transitent par LISTEN/NOTIFY pour atteindre toutes les instances de l'API.
+
+PG_CHANNEL = "post_events"
+
+class EventBus:
+    def __init__(self, buffer_size: int):
+        self._lock = threading.Lock()
+        self._buffer = deque(maxlen=buffer_size)  # Derniers événements, pour la reprise (Last-Event-ID)
+        self._evicted_id = 0  # Id du dernier événement sorti du buffer
+        self._last_id = 0
+        self._subscribers = {}  # queue -> (user_id, boucle asyncio)
+
+    def _next_id(self) -> int:
+        # Ids croissants basés sur l'horloge : comparables d'une instance à l'autre
+        self._last_id = max(self._last_id + 1, time.time_ns() // 1000)
+        return self._last_id
+
+    def dispatch(self, user_id: int, event_type: str, data: dict):
+        """Enregistre l'événement et le transmet aux abonnés de l'utilisateur (appelable depuis n'importe quel thread)."""
+        with self._lock:
+            event = {"id": self._next_id(), "user_id": user_id, "type": event_type, "data": data}
+            if len(self._buffer) == self._buffer.maxlen:
+                self._evicted_id = self._buffer[0]["id"]
+            self._buffer.append(event)
+            targets = [(queue, loop) for queue, (uid, loop) in self._subscribers.items() if uid == user_id]
+        for queue, loop in targets:
+            try:
+                loop.call_soon_threadsafe(_offer, queue, event)
+            except RuntimeError:
+                pass  # Boucle fermée (arrêt de l'application)
+
+    @asynccontextmanager
+    async def subscribe(self, user_id: int, last_event_id: Optional[int] = None):
+        """
+        Abonne le flux de l'utilisateur. La file reçoit d'abord les événements manqués depuis `last_event_id`,
+        précédés d'un événement 'resync' si certains ont déjà quitté le buffer. None dans la file = abonné décroché.
+        """
+        queue = asyncio.Queue(maxsize=settings.EVENTS_QUEUE_SIZE)
+        with self._lock:
+            if last_event_id is not None:
+                if last_event_id < self._evicted_id:
+                    _offer(queue, {"id": last_event_id, "user_id": user_id, "type": "resync", "data": {}})
+                for event in self._buffer:
+                    if event["user_id"] == user_id and event["id"] > last_event_id:
+                        _offer(queue, event)
+            self._subscribers[queue] = (user_id, asyncio.get_running_loop())
+        try:
+            yield queue
+        finally:
+            with self._lock:
+                self._subscribers.pop(queue, None)
+
+def _offer(queue: asyncio.Queue, event: dict):
+    """Un abonné trop lent est décroché (None) : le client se reconnecte avec Last-Event-ID."""
+    try:
+        queue.put_nowait(event)
+    except asyncio.QueueFull:
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(None)
+
+event_bus = EventBus(settings.EVENTS_BUFFER_SIZE)
+
+def publish_events(events: list[tuple[int, str, dict]]):
+    """
+    Publie des événements (user_id, type, données), en une seule transaction NOTIFY avec le pont Postgres.
+    Ne lève jamais : la publication d'un post ne doit pas dépendre du flux d'événements.
+    """
+    if not events:
+        return
+    if settings.EVENTS_PG_BRIDGE:
+        try:
+            with engine.begin() as connection:
+                for user_id, event_type, data in events:
+                    payload = json.dumps({"user_id": user_id, "type": event_type, "data": data}, default=str)
+                    connection.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": PG_CHANNEL, "payload": payload})
+            return  # Les événements reviennent à cette instance par LISTEN
+        except Exception as e:
+            print(f"Erreur NOTIFY, diffusion locale uniquement: {e}")
+    for user_id, event_type, data in events:
+        event_bus.dispatch(user_id, event_type, data)
+
+def publish_post_statuses(posts: list[tuple[int, int, str, Optional[str]]], groups: list[tuple[int, int, str]] = ()):
+    """Publie les transitions (user_id, post_id, statut, erreur) et (user_id, group_id, statut) d'un lot."""
+    publish_events(
+        [(user_id, "post.status", {"post_id": post_id, "status": status, "error_message": error_message})
+         for user_id, post_id, status, error_message in posts]
+        + [(user_id, "group.status", {"group_id": group_id, "status": status}) for user_id, group_id, status in groups]
+    )
+
+def _listen_forever(stop: threading.Event):
+    """Thread du pont Postgres : LISTEN sur une connexion dédiée, reconnexion en cas d'erreur."""
+    while not stop.is_set():
+        connection = None
+        try:
+            cargs, cparams = engine.dialect.create_connect_args(engine.url)
+            connection = engine.dialect.dbapi.connect(*cargs, **cparams)
+            connection.autocommit = True
+            connection.cursor().execute(f"LISTEN {PG_CHANNEL}")
+            print("Pont d'événements Postgres : à l'écoute.")
+            while not stop.is_set():
+                if select.select([connection], [], [], 5) == ([], [], []):
+                    continue
+                connection.poll()
+                while connection.notifies:
+                    notify = connection.notifies.pop(0)
+                    event = json.loads(notify.payload)
+                    event_bus.dispatch(event["user_id"], event["type"], event["data"])
+        except Exception as e:
+            print(f"Pont d'événements Postgres interrompu: {e}")
+            stop.wait(5)
+        finally:
+            if connection is not None:
+                connection.close()
+
+_bridge_stop = threading.Event()
+
+def start_event_bridge():
+    if settings.EVENTS_PG_BRIDGE and engine.dialect.name == "postgresql":
+        _bridge_stop.clear()
+        threading.Thread(target=_listen_forever, args=(_bridge_stop,), name="events-pg-bridge", daemon=True).start()
+    elif settings.EVENTS_PG_BRIDGE:
+        print("EVENTS_PG_BRIDGE ignoré : la base n'est pas Postgres.")
+        settings.EVENTS_PG_BRIDGE = False
+
+def stop_event_bridge():
+    _bridge_stop.set()
@@ -6,3 +6,12 @@ api = WebhookAPI(platform='facebook')
 
 def post_update(title, text, image_path_or_url):
     return api.post_update(title, text, image_path_or_url)
+
+def build_payload(title, text, image_path_or_url):
+    return api.build_payload(title, text, image_path_or_url)
+
+def send_payload(payload):
+    return api.send_payload(payload)
+
+def warm_up():
+    return api.warm_up()
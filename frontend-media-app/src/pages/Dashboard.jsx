@@ -1,7 +1,7 @@
 import { useState, useEffect } from 'react';
 import { useNavigate } from 'react-router-dom';
-import { LogOut, Plus, Calendar, Clock, Send, Trash2, Image as ImageIcon } from 'lucide-react';
-import api from '../api';
+import { LogOut, Plus, Calendar, Clock, Send, Trash2, Image as ImageIcon, AlertTriangle } from 'lucide-react';
+import api, { API_URL } from '../api';
 import CreatePostModal from '../components/CreatePostModal';
 import CalendarView from '../components/CalendarView';
 
@@ -17,6 +17,28 @@ export default function Dashboard() {
         fetchPosts();
     }, []);
 
+    // Statuts poussés par le serveur (SSE) : plus besoin de recharger la liste pour suivre les envois
+    useEffect(() => {
+        const token = localStorage.getItem('token');
+        if (!token) return;
+
+        const source = new EventSource(`${API_URL}/posts/events?access_token=${encodeURIComponent(token)}`);
+        source.addEventListener('post.status', (event) => {
+            const { post_id, status, error_message } = JSON.parse(event.data);
+            setPosts(current => current.map(p => (
+                p.id === post_id ? { ...p, status, error_message: error_message ?? p.error_message } : p
+            )));
+        });
+        // Pré-vérification avant échéance : avertissement affiché (ou effacé) sur le post programmé
+        source.addEventListener('post.preflight', (event) => {
+            const { post_id, error_message } = JSON.parse(event.data);
+            setPosts(current => current.map(p => (p.id === post_id ? { ...p, error_message } : p)));
+        });
+        // Des événements ont été perdus pendant la déconnexion : on recharge tout
+        source.addEventListener('resync', () => fetchPosts());
+        return () => source.close();
+    }, []);
+
     const fetchPosts = async () => {
         try {
             const response = await api.get('/posts');
@@ -59,12 +81,16 @@ export default function Dashboard() {
     const getStatusBadge = (status) => {
         const styles = {
             scheduled: 'bg-blue-100 text-blue-800',
+            publishing: 'bg-yellow-100 text-yellow-800',
+            published: 'bg-green-100 text-green-800',
             sent: 'bg-green-100 text-green-800',
             failed: 'bg-red-100 text-red-800',
         };
 
         const labels = {
             scheduled: 'Programmé',
+            publishing: 'Envoi en cours',
+            published: 'Publié',
             sent: 'Envoyé',
             failed: 'Échec',
         };
@@ -177,6 +203,13 @@ export default function Dashboard() {
                                     )}
                                 </div>
 
+                                {post.status === 'scheduled' && post.error_message && (
+                                    <div className="flex items-center gap-1 text-sm text-amber-700 bg-amber-50 rounded-lg px-3 py-2 mb-4">
+                                        <AlertTriangle size={16} />
+                                        <span>{post.error_message}</span>
+                                    </div>
+                                )}
+
                                 <div className="flex gap-2">
                                     {post.status === 'scheduled' && (
                                         <>
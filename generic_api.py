@@ -1,4 +1,7 @@
+import json
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.connection import is_connection_dropped
 from typing import Optional
 from config import settings
 
@@ -6,6 +9,9 @@ class WebhookAPI:
     def __init__(self, platform: str):
         self.platform = platform
         self.webhook_url = self._get_webhook_url(platform)
+        # Session persistante : la connexion TCP/TLS au webhook est réutilisée d'un envoi à l'autre (keep-alive)
+        self.http = requests.Session()
+        self.http.mount("https://", HTTPAdapter(pool_maxsize=max(10, settings.DISPATCH_CONCURRENCY)))
         
         print(f"Initialisation du client API pour {self.platform.capitalize()} (via Webhook)...")
         if not self.webhook_url:
@@ -20,7 +26,7 @@ class WebhookAPI:
             return settings.FACEBOOK_WEBHOOK_URL
         return ""
 
-    def post_update(self, title: Optional[str], text: str, image_path_or_url: Optional[str] = None) -> tuple[bool, str]:
+    def build_payload(self, title: Optional[str], text: str, image_path_or_url: Optional[str] = None) -> dict:
         print("-" * 20)
         print(f"Préparation de l'envoi au webhook pour publication sur {self.platform.capitalize()}...")
         
@@ -41,7 +47,12 @@ class WebhookAPI:
             "text": full_text,
             "image_url": image_url 
         }
-        
+        return payload
+
+    def post_update(self, title: Optional[str], text: str, image_path_or_url: Optional[str] = None) -> tuple[bool, str]:
+        return self.send_payload(self.build_payload(title, text, image_path_or_url))
+
+    def send_payload(self, payload: dict) -> tuple[bool, str]:
         # LOGGING DEBUG
         print(f"DEBUG PAYLOAD ({self.platform}): {payload}")
 
@@ -49,7 +60,7 @@ class WebhookAPI:
              return False, f"URL Webhook non configurée pour {self.platform}"
 
         try:
-            response = requests.post(self.webhook_url, json=payload, timeout=15)
+            response = self.http.post(self.webhook_url, json=payload, timeout=15)
             
             # LOGGING RESPONSE
             print(f"DEBUG RESPONSE STATUS: {response.status_code}")
@@ -58,7 +69,6 @@ class WebhookAPI:
             # Make.com retourne souvent "Accepted" ou juste 200 OK
             if response.status_code >= 200 and response.status_code < 300:
                 # On ajoute le payload au message pour le debug client
-                import json
                 payload_str = json.dumps(payload, default=str)
                 message = f"Webhook reçu. Payload envoyé: {payload_str}"
                 print(f">>> SUCCÈS : {message}")
@@ -71,3 +81,32 @@ class WebhookAPI:
             message = f"Erreur de connexion au webhook pour {self.platform.capitalize()} : {e}"
             print(f">>> ÉCHEC CRITIQUE : {message}")
             return False, message
+
+    def warm_up(self) -> bool:
+        """
+        Ouvre à l'avance la connexion TCP/TLS vers le webhook et la laisse dans le pool de la session.
+        Aucune requête HTTP n'est envoyée : un GET ou un HEAD déclencherait le scénario Make.
+        Repose sur l'API de pool de requests 2.32+ / urllib3 2.x (versions bornées dans requirements.txt).
+        """
+        if not self.webhook_url:
+            return False
+        try:
+            adapter = self.http.get_adapter(self.webhook_url)
+            # Mêmes réglages que l'envoi (proxy, certificats) : même pool, donc même connexion
+            options = self.http.merge_environment_settings(self.webhook_url, {}, None, None, None)
+            request = requests.Request("POST", self.webhook_url).prepare()
+            pool = adapter.get_connection_with_tls_context(
+                request, verify=options["verify"], proxies=options["proxies"], cert=options["cert"]
+            )
+            connection = pool._get_conn()
+            try:
+                # Connexion inactive fermée par le serveur depuis le dernier envoi : on la rouvre
+                if connection.sock is None or is_connection_dropped(connection):
+                    connection.close()
+                    connection.connect()
+            finally:
+                pool._put_conn(connection)
+            return True
+        except Exception as e:
+            print(f"Préchauffage de la connexion au webhook {self.platform.capitalize()} impossible : {e}")
+            return False
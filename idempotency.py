@@ -0,0 +1,173 @@
+import hashlib
+import json
+from datetime import datetime, timedelta
+from typing import Any, Callable, Optional
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy import func
+from sqlmodel import Session, delete, update
+from config import settings
+from database import engine
+from models import IdempotencyKey
+
+# Les clés sont gérées dans leurs propres sessions courtes : la réservation doit être
+# visible des autres requêtes immédiatement, indépendamment de la transaction de la route.
+
+def request_fingerprint(body: Any) -> Optional[str]:
+    """Empreinte du corps de la requête sous forme canonique (clés triées) ; None sans corps."""
+    if body is None:
+        return None
+    canonical = json.dumps(jsonable_encoder(body), sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+def _take_over_stale(session: Session, key: str, now: datetime) -> bool:
+    """
+    Reprend une réservation 'in_progress' plus ancienne que PUBLISH_CLAIM_TIMEOUT_MINUTES (serveur arrêté
+    pendant la requête, clé jamais libérée). Atomique : un seul nouvel essai concurrent la reprend.
+    """
+    cutoff = now - timedelta(minutes=settings.PUBLISH_CLAIM_TIMEOUT_MINUTES)
+    result = session.exec(
+        update(IdempotencyKey)
+        .where(
+            IdempotencyKey.key == key,
+            IdempotencyKey.status == "in_progress",
+            func.coalesce(IdempotencyKey.reserved_at, IdempotencyKey.created_at) < cutoff,
+        )
+        .values(reserved_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    session.commit()
+    return result.rowcount == 1
+
+def _reserve(key: str, request_path: str, request_hash: Optional[str]) -> Optional[JSONResponse]:
+    """
+    Réserve la clé. Retourne la réponse mémorisée si la requête a déjà été traitée,
+    lève 409 si elle est encore en cours, None si la clé vient d'être réservée (ou reprise).
+    Une clé réutilisée pour une autre route ou un autre corps de requête est refusée (422).
+    """
+    now = datetime.utcnow()
+    with Session(engine) as session:
+        existing = session.get(IdempotencyKey, key)
+        if existing and existing.expires_at <= now:
+            session.delete(existing)
+            session.commit()
+            existing = None
+
+        if existing is None:
+            session.add(IdempotencyKey(
+                key=key,
+                request_path=request_path,
+                request_hash=request_hash,
+                expires_at=now + timedelta(hours=settings.IDEMPOTENCY_TTL_HOURS),
+            ))
+            try:
+                session.commit()
+                return None
+            except IntegrityError:
+                # Une requête concurrente avec la même clé vient de la réserver
+                session.rollback()
+                existing = session.get(IdempotencyKey, key)
+
+        if existing.request_path != request_path:
+            raise HTTPException(status_code=422, detail="Idempotency-Key already used for another request")
+        # Clé enregistrée avant l'empreinte des requêtes (request_hash NULL) : acceptée
+        if existing.request_hash is not None and existing.request_hash != request_hash:
+            raise HTTPException(status_code=422, detail="Idempotency-Key already used with a different request body")
+        if existing.status != "completed":
+            if _take_over_stale(session, key, now):
+                print(f"Idempotency-Key reprise après une requête interrompue : {key}")
+                return None
+            raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is already in progress")
+
+        print(f"Idempotency-Key rejouée : {key}")
+        return JSONResponse(status_code=existing.status_code, content=json.loads(existing.response_body))
+
+def _complete(key: str, status_code: int, body):
+    with Session(engine) as session:
+        record = session.get(IdempotencyKey, key)
+        if record:
+            record.status = "completed"
+            record.status_code = status_code
+            record.response_body = json.dumps(jsonable_encoder(body), default=str)
+            session.add(record)
+            session.commit()
+
+def _release(key: str):
+    """Libère la clé pour que le client puisse réessayer (erreur serveur)."""
+    with Session(engine) as session:
+        record = session.get(IdempotencyKey, key)
+        if record:
+            session.delete(record)
+            session.commit()
+
+def run_idempotent(idempotency_key: Optional[str], scope: str, request_path: str, handler: Callable, body: Any = None):
+    """
+    Exécute `handler` une seule fois par Idempotency-Key.
+    Les réponses 2xx et 4xx sont mémorisées et rejouées à l'identique pendant IDEMPOTENCY_TTL_HOURS ;
+    en cas d'erreur 5xx la clé est libérée pour permettre un nouvel essai.
+    `body` (le corps de la requête) est mémorisé sous forme d'empreinte : rejouer la clé avec un autre corps est refusé.
+    Sans clé, `handler` est simplement exécuté.
+    """
+    if not idempotency_key:
+        return handler()
+
+    key = f"{scope}:{idempotency_key}"
+    replay = _reserve(key, request_path, request_fingerprint(body))
+    if replay is not None:
+        return replay
+
+    try:
+        result = handler()
+    except HTTPException as e:
+        if e.status_code >= 500:
+            _release(key)
+        else:
+            _complete(key, e.status_code, {"detail": e.detail})
+        raise
+    except Exception:
+        _release(key)
+        raise
+
+    _complete(key, 200, result)
+    return result
+
+async def run_idempotent_async(
+    idempotency_key: Optional[str], scope: str, request_path: str, handler: Callable, body: Any = None
+):
+    """
+    Équivalent de run_idempotent pour les routes asynchrones (`handler` est une coroutine).
+    Les accès courts à la table des clés passent par le pool de threads.
+    """
+    if not idempotency_key:
+        return await handler()
+
+    key = f"{scope}:{idempotency_key}"
+    replay = await run_in_threadpool(_reserve, key, request_path, request_fingerprint(body))
+    if replay is not None:
+        return replay
+
+    try:
+        result = await handler()
+    except HTTPException as e:
+        if e.status_code >= 500:
+            await run_in_threadpool(_release, key)
+        else:
+            await run_in_threadpool(_complete, key, e.status_code, {"detail": e.detail})
+        raise
+    except Exception:
+        await run_in_threadpool(_release, key)
+        raise
+
+    await run_in_threadpool(_complete, key, 200, result)
+    return result
+
+def purge_expired_idempotency_keys():
+    """Supprime les clés expirées (job périodique du scheduler)."""
+    with Session(engine) as session:
+        result = session.exec(delete(IdempotencyKey).where(IdempotencyKey.expires_at <= datetime.utcnow()))
+        session.commit()
+        if result.rowcount:
+            print(f"{result.rowcount} clé(s) d'idempotence expirée(s) supprimée(s).")
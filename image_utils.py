@@ -1,5 +1,7 @@
 import io
-from PIL import Image
+import threading
+from contextlib import contextmanager
+from PIL import Image, features
 import cloudinary
 import cloudinary.uploader
 from config import settings
@@ -7,23 +9,95 @@ from config import settings
 # --- Constantes ---
 FINAL_IMAGE_HEIGHT = 1980
 SPACE_BETWEEN_IMAGES = 50  # Espace en pixels entre les images
+MAX_DIMENSION = 1280  # Taille max sur le plus grand côté (profil par défaut)
+JPEG_QUALITY = 90
+MIN_QUALITY = 40  # Qualité plancher lors de la recherche du budget d'octets
+MAX_ENCODE_ATTEMPTS = 6  # Nombre max d'encodages pour atteindre le budget
+
+# Options d'encodage par format (JPEG progressif et optimisé : plus petit, affichage progressif)
+ENCODER_OPTIONS = {
+    'JPEG': {"progressive": True, "optimize": True},
+    'WEBP': {"method": 4},
+    'AVIF': {"speed": 6},
+}
+
+# --- Profils de rendu par plateforme ---
+# max_width / max_height : boîte maximale (pas d'agrandissement)
+# aspect_range : (ratio min, ratio max) largeur/hauteur accepté par la plateforme, None = libre
+# fit : 'pad' (marges blanches) ou 'crop' (recadrage centré) pour rentrer dans aspect_range
+# format : 'JPEG', 'WEBP' ou 'AVIF' (repli automatique si Pillow ne sait pas l'encoder)
+# max_bytes : budget de taille du fichier final
+# Les plateformes restent en JPEG : l'API Instagram n'accepte que ce format.
+RENDITION_PROFILES = {
+    'default': {
+        "max_width": MAX_DIMENSION, "max_height": MAX_DIMENSION, "aspect_range": None, "fit": 'pad',
+        "format": 'JPEG', "quality": JPEG_QUALITY, "max_bytes": None,
+    },
+    'linkedin': {
+        "max_width": 1200, "max_height": 1500, "aspect_range": None, "fit": 'pad',
+        "format": 'JPEG', "quality": 85, "max_bytes": 5 * 1024 * 1024,
+    },
+    'instagram': {
+        # Instagram refuse les images hors 4:5 -> 1.91:1 (les collages verticaux sont complétés en 4:5)
+        "max_width": 1080, "max_height": 1350, "aspect_range": (4 / 5, 1.91), "fit": 'pad',
+        "format": 'JPEG', "quality": 85, "max_bytes": 8 * 1024 * 1024,
+    },
+    'facebook': {
+        "max_width": 2048, "max_height": 2048, "aspect_range": None, "fit": 'pad',
+        "format": 'JPEG', "quality": 85, "max_bytes": 4 * 1024 * 1024,
+    },
+}
+
+# Le canevas combiné n'a jamais besoin d'être plus large que le plus grand rendu
+COMBINE_MAX_WIDTH = max(profile["max_width"] for profile in RENDITION_PROFILES.values())
+BYTES_PER_PIXEL = 4  # Pillow stocke les images RGB/RGBA sur 4 octets par pixel
+
+# --- Contrôle d'admission mémoire ---
+class ImageMemoryBudgetExceeded(Exception):
+    """Le traitement ne peut pas être admis dans le budget mémoire du processus."""
+    def __init__(self, message: str, retryable: bool = True):
+        super().__init__(message)
+        self.retryable = retryable  # False : le traitement dépasse à lui seul le budget total
+
+class MemoryBudget:
+    """Budget d'octets partagé par tous les traitements d'images du processus."""
+    def __init__(self, total_bytes: int):
+        self.total_bytes = total_bytes
+        self.used_bytes = 0
+        self._condition = threading.Condition()
+
+    @contextmanager
+    def reserve(self, nbytes: int, timeout: float):
+        if nbytes > self.total_bytes:
+            raise ImageMemoryBudgetExceeded(
+                f"Traitement estimé à {nbytes // (1024 * 1024)} Mo, au-delà du budget de "
+                f"{self.total_bytes // (1024 * 1024)} Mo.", retryable=False
+            )
+        with self._condition:
+            admitted = self._condition.wait_for(lambda: self.used_bytes + nbytes <= self.total_bytes, timeout)
+            if not admitted:
+                raise ImageMemoryBudgetExceeded("Budget mémoire épuisé par d'autres traitements d'images.")
+            self.used_bytes += nbytes
+        try:
+            yield
+        finally:
+            with self._condition:
+                self.used_bytes -= nbytes
+                self._condition.notify_all()
+
+memory_budget = MemoryBudget(settings.IMAGE_MEMORY_BUDGET_MB * 1024 * 1024)
 
 # --- Configuration Cloudinary ---
 # Cloudinary est configuré automatiquement via la variable d'environnement CLOUDINARY_URL
 # ou on peut le configurer manuellement si besoin, mais CLOUDINARY_URL est le standard.
 
-def combine_and_resize_images(image_paths: list[str], platform: str) -> io.BytesIO | None:
+def _open_sources(image_paths: list) -> list[Image.Image]:
     """
-    Combine jusqu'à 3 images verticalement, les redimensionne et retourne un objet BytesIO.
-    Prend en compte les contraintes spécifiques à la plateforme.
+    Ouvre les sources sans les décoder (Image.open ne lit que l'en-tête) et prépare
+    le décodage JPEG à échelle réduite (draft) vers la largeur du canevas.
     """
-    if not image_paths:
-        return None
-
     # Note: image_paths ici peuvent être des chemins locaux (pour le dev) ou des objets file-like
-    # Dans le contexte d'une API, on recevra probablement des bytes directement.
-    # Pour l'instant, on suppose que ce sont des fichiers ouverts ou des chemins.
-    
+    # (BytesIO reçus par l'API). Image.open accepte les deux.
     images = []
     for path in image_paths:
         try:
@@ -33,55 +107,257 @@ def combine_and_resize_images(image_paths: list[str], platform: str) -> io.Bytes
             print(f"Erreur lors de l'ouverture de l'image {path}: {e}")
             continue
 
-    if not images:
-        return None
-    
-    # --- Redimensionnement proportionnel initial ---
-    base_width = images[0].width
-    resized_images = [images[0]]
-    for img in images[1:]:
+    if images:
+        base_width = min(images[0].width, COMBINE_MAX_WIDTH)
+        for img in images:
+            # Sans effet hors JPEG ; après draft, img.size reflète la taille qui sera décodée
+            img.draft(img.mode, (base_width, max(1, int(img.height * base_width / img.width))))
+    return images
+
+def _combined_layout(images: list[Image.Image]) -> tuple[int, list[tuple[int, int]], int]:
+    """Largeur du canevas, taille de chaque image une fois mise à cette largeur, hauteur totale."""
+    base_width = min(images[0].width, COMBINE_MAX_WIDTH)
+    sizes = []
+    for img in images:
         if img.width != base_width:
-            aspect_ratio = img.height / img.width
-            new_height = int(aspect_ratio * base_width)
-            resized_images.append(img.resize((base_width, new_height), Image.LANCZOS))
+            sizes.append((base_width, int(img.height / img.width * base_width)))
         else:
-            resized_images.append(img)
+            sizes.append(img.size)
+    total_height = sum(h for _, h in sizes) + SPACE_BETWEEN_IMAGES * (len(sizes) - 1)
+    return base_width, sizes, total_height
 
-    # --- Création de l'image combinée ---
-    total_height = sum(img.height for img in resized_images) + SPACE_BETWEEN_IMAGES * (len(resized_images) - 1)
+def estimate_peak_bytes(images: list[Image.Image], platforms: list[str]) -> int:
+    """
+    Pic mémoire estimé à partir des seuls en-têtes : le canevas, plus au pire
+    une source décodée et sa copie redimensionnée, ou les intermédiaires d'un rendu.
+    """
+    base_width, sizes, total_height = _combined_layout(images)
+    canvas = base_width * total_height * BYTES_PER_PIXEL
+    per_source = max(
+        (img.width * img.height + w * h) * BYTES_PER_PIXEL
+        for img, (w, h) in zip(images, sizes)
+    )
+    per_rendition = 0
+    for platform in platforms:
+        _, profile = get_rendition_profile(platform)
+        # Image redimensionnée + canevas de marges, bornés par la boîte du profil
+        box = min(profile["max_width"] * profile["max_height"], base_width * total_height)
+        pixels = 2 * box
+        if profile["fit"] == 'crop' and profile.get("aspect_range"):
+            pixels += base_width * total_height  # Copie recadrée du canevas
+        per_rendition = max(per_rendition, pixels * BYTES_PER_PIXEL)
+    return canvas + max(per_source, per_rendition)
+
+def _build_combined_image(images: list[Image.Image]) -> Image.Image:
+    """
+    Assemble verticalement les sources sur un canevas blanc.
+    Les sources sont décodées une à une et libérées dès qu'elles ont été collées.
+    """
+    base_width, sizes, total_height = _combined_layout(images)
     combined_image = Image.new('RGB', (base_width, total_height), 'white')
 
     current_y = 0
-    for img in resized_images:
+    for img, size in zip(images, sizes):
+        img.load()
+        if img.size != size:
+            resized = img.resize(size, Image.LANCZOS)
+            img.close()
+            img = resized
         combined_image.paste(img, (0, current_y))
-        current_y += img.height + SPACE_BETWEEN_IMAGES
-
-    # --- Redimensionnement final (Max 1280px sur le plus grand côté) ---
-    max_dimension = 1280
-    width, height = combined_image.size
-    
-    if width > max_dimension or height > max_dimension:
-        if width > height:
-            # Paysage : on fixe la largeur à 1280
-            new_width = max_dimension
-            new_height = int(height * (max_dimension / width))
-        else:
-            # Portrait ou Carré : on fixe la hauteur à 1280
-            new_height = max_dimension
-            new_width = int(width * (max_dimension / height))
-            
-        final_image = combined_image.resize((new_width, new_height), Image.LANCZOS)
-        print(f"Image redimensionnée à {new_width}x{new_height} (Max 1280px)")
-    else:
-        final_image = combined_image
-        print(f"Image conservée à {width}x{height} (<= 1280px)")
-
-    # --- Sauvegarde en mémoire ---
+        img.close()
+        current_y += size[1] + SPACE_BETWEEN_IMAGES
+
+    return combined_image
+
+def get_rendition_profile(platform: str) -> tuple[str, dict]:
+    """Retourne (nom du profil, profil) pour une plateforme, ou le profil par défaut."""
+    if platform in RENDITION_PROFILES:
+        return platform, RENDITION_PROFILES[platform]
+    return 'default', RENDITION_PROFILES['default']
+
+def _apply_profile_geometry(image: Image.Image, profile: dict) -> Image.Image:
+    """
+    Ramène l'image dans la plage de ratio du profil (recadrage ou marges blanches),
+    puis la réduit pour tenir dans max_width x max_height. Jamais d'agrandissement.
+    """
+    width, height = image.size
+    ratio = width / height
+    min_ratio, max_ratio = profile.get("aspect_range") or (ratio, ratio)
+    target_ratio = min(max(ratio, min_ratio), max_ratio)
+
+    # Dimensions de la zone utile après application du ratio (à l'échelle de la source)
+    box_width, box_height = width, height
+    if target_ratio != ratio:
+        if profile["fit"] == 'crop':
+            if ratio > target_ratio:
+                box_width = round(height * target_ratio)
+            else:
+                box_height = round(width / target_ratio)
+            left = (width - box_width) // 2
+            top = (height - box_height) // 2
+            image = image.crop((left, top, left + box_width, top + box_height))
+            width, height = box_width, box_height
+        else:  # 'pad'
+            if ratio > target_ratio:
+                box_height = round(width / target_ratio)
+            else:
+                box_width = round(height * target_ratio)
+
+    scale = min(1.0, profile["max_width"] / box_width, profile["max_height"] / box_height)
+    if scale < 1.0:
+        width, height = max(1, round(width * scale)), max(1, round(height * scale))
+        image = image.resize((width, height), Image.LANCZOS)
+        box_width, box_height = max(1, round(box_width * scale)), max(1, round(box_height * scale))
+
+    if (box_width, box_height) != (width, height):
+        canvas = Image.new('RGB', (box_width, box_height), 'white')
+        canvas.paste(image, ((box_width - width) // 2, (box_height - height) // 2))
+        image = canvas
+
+    return image
+
+def _resolve_format(image_format: str) -> str:
+    """Format réellement utilisable avec le Pillow installé (AVIF -> WEBP -> JPEG)."""
+    if image_format == 'AVIF' and not features.check('avif'):
+        print("AVIF non supporté par Pillow, repli sur WEBP.")
+        image_format = 'WEBP'
+    if image_format == 'WEBP' and not features.check('webp'):
+        print("WEBP non supporté par Pillow, repli sur JPEG.")
+        image_format = 'JPEG'
+    return image_format
+
+def _encode_once(image: Image.Image, image_format: str, quality: int) -> io.BytesIO:
     output = io.BytesIO()
-    final_image.save(output, format='JPEG', quality=90)
-    output.seek(0)
+    image.save(output, format=image_format, quality=quality, **ENCODER_OPTIONS.get(image_format, {}))
     return output
 
+def encode_image(image: Image.Image, image_format: str = 'JPEG', quality: int = JPEG_QUALITY,
+                 max_bytes: int | None = None, min_quality: int = MIN_QUALITY,
+                 max_attempts: int = MAX_ENCODE_ATTEMPTS) -> tuple[io.BytesIO, dict]:
+    """
+    Encode l'image en visant la meilleure qualité qui tient dans `max_bytes`.
+    Recherche dichotomique entre min_quality et quality, bornée à max_attempts encodages.
+    Si aucune qualité ne tient dans le budget, le plus petit résultat obtenu est retenu.
+    Retourne (données, rapport) ; le rapport décrit les réglages choisis et la taille obtenue.
+    """
+    image_format = _resolve_format(image_format)
+    if image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+
+    chosen_quality = quality
+    chosen = _encode_once(image, image_format, quality)
+    attempts = 1
+
+    if max_bytes and chosen.tell() > max_bytes:
+        fitting = None
+        low, high = min_quality, quality - 1
+        while low <= high and attempts < max_attempts:
+            mid = (low + high) // 2
+            output = _encode_once(image, image_format, mid)
+            attempts += 1
+            if output.tell() <= max_bytes:
+                fitting = (output, mid)
+                low = mid + 1  # Tient dans le budget : on tente plus haut
+            else:
+                if output.tell() < chosen.tell():
+                    chosen, chosen_quality = output, mid
+                high = mid - 1
+        if fitting:
+            chosen, chosen_quality = fitting
+
+    size = chosen.tell()
+    chosen.seek(0)
+    report = {
+        "format": image_format,
+        "quality": chosen_quality,
+        "bytes": size,
+        "max_bytes": max_bytes,
+        "within_budget": not max_bytes or size <= max_bytes,
+        "attempts": attempts,
+        "width": image.width,
+        "height": image.height,
+    }
+    return chosen, report
+
+def _render_variant(combined_image: Image.Image, platform: str) -> tuple[io.BytesIO, dict]:
+    """Produit le rendu final d'une plateforme à partir du canevas combiné."""
+    profile_name, profile = get_rendition_profile(platform)
+
+    final_image = _apply_profile_geometry(combined_image, profile)
+    output, report = encode_image(
+        final_image,
+        image_format=profile["format"],
+        quality=profile["quality"],
+        max_bytes=profile.get("max_bytes"),
+        min_quality=profile.get("min_quality", MIN_QUALITY),
+    )
+    report["profile"] = profile_name
+    if final_image is not combined_image:
+        final_image.close()
+
+    print(f"Rendu '{profile_name}' : {report['width']}x{report['height']} {report['format']} "
+          f"q{report['quality']}, {report['bytes'] // 1024} Ko ({report['attempts']} encodage(s))")
+    return output, report
+
+def _admitted(images: list[Image.Image], platforms: list[str]):
+    """Réserve le pic mémoire estimé du traitement dans le budget global (attente bornée)."""
+    peak = estimate_peak_bytes(images, platforms)
+    print(f"Traitement d'images : pic estimé {peak // (1024 * 1024)} Mo")
+    return memory_budget.reserve(peak, timeout=settings.IMAGE_MEMORY_WAIT_SECONDS)
+
+def combine_and_resize_images(image_paths: list[str], platform: str, report: dict | None = None) -> io.BytesIO | None:
+    """
+    Combine jusqu'à 3 images verticalement, les redimensionne et retourne un objet BytesIO.
+    Prend en compte les contraintes spécifiques à la plateforme.
+    Si `report` est fourni, il est complété avec les réglages d'encodage retenus.
+    Lève ImageMemoryBudgetExceeded si le traitement ne peut pas être admis en mémoire.
+    """
+    if not image_paths:
+        return None
+
+    images = _open_sources(image_paths)
+    if not images:
+        return None
+
+    with _admitted(images, [platform]):
+        combined_image = _build_combined_image(images)
+        output, encoding = _render_variant(combined_image, platform)
+        combined_image.close()
+
+    if report is not None:
+        report.update(encoding)
+    return output
+
+def render_platform_variants(image_paths: list, platforms: list[str], reports: dict | None = None) -> dict[str, io.BytesIO]:
+    """
+    Décode et combine les images une seule fois, puis produit un rendu par plateforme
+    selon son profil (RENDITION_PROFILES).
+    Les plateformes partageant le même profil reçoivent le même objet BytesIO.
+    Si `reports` est fourni, il reçoit le rapport d'encodage de chaque plateforme.
+    Retourne un dict vide si aucune image n'a pu être traitée.
+    Lève ImageMemoryBudgetExceeded si le traitement ne peut pas être admis en mémoire.
+    """
+    if not image_paths or not platforms:
+        return {}
+
+    images = _open_sources(image_paths)
+    if not images:
+        return {}
+
+    renders = {}
+    variants = {}
+    with _admitted(images, platforms):
+        combined_image = _build_combined_image(images)
+        for platform in platforms:
+            key, _ = get_rendition_profile(platform)
+            if key not in renders:
+                renders[key] = _render_variant(combined_image, platform)
+            variants[platform], encoding = renders[key]
+            if reports is not None:
+                reports[platform] = encoding
+        combined_image.close()
+    return variants
+
 def upload_image_to_cloudinary(image_data: io.BytesIO, folder: str = "media_auto_publish") -> str | None:
     """
     Télécharge une image sur Cloudinary et retourne l'URL sécurisée.
@@ -94,3 +370,16 @@ def upload_image_to_cloudinary(image_data: io.BytesIO, folder: str = "media_auto
     except Exception as e:
         print(f"Erreur lors de l'upload Cloudinary: {e}")
         return None
+
+def upload_platform_variants(variants: dict[str, io.BytesIO], folder: str = "media_auto_publish") -> dict[str, str | None]:
+    """
+    Télécharge les rendus de chaque plateforme sur Cloudinary.
+    Un rendu partagé par plusieurs plateformes n'est téléchargé qu'une seule fois.
+    """
+    uploaded = {}
+    image_urls = {}
+    for platform, image_data in variants.items():
+        if id(image_data) not in uploaded:
+            uploaded[id(image_data)] = upload_image_to_cloudinary(image_data, folder=folder)
+        image_urls[platform] = uploaded[id(image_data)]
+    return image_urls
@@ -3,9 +3,12 @@ Script Keep-Alive pour Media Auto Publish
 ==========================================
 
 Ce script maintient le serveur actif et vérifie les publications en attente
-toutes les 5 minutes en envoyant une requête HTTP.
+en envoyant une requête HTTP.
 
-NOUVEAU : Gestion des tranches horaires actives pour économiser les ressources.
+Deux modes :
+    - ADAPTATIF (par défaut) : le script demande au serveur la date de la prochaine
+      publication (/posts/next-due) et dort jusqu'à juste avant, avec un plafond.
+    - INTERVALLE FIXE : ping toutes les INTERVAL_MINUTES, dans les tranches horaires actives.
 
 Usage:
     python keep_alive.py
@@ -14,6 +17,7 @@ Configuration:
     - Modifiez SERVER_URL avec l'URL de votre serveur Render
     - Ajustez INTERVAL_MINUTES selon vos besoins (min 5 minutes recommandé)
     - Configurez ACTIVE_TIME_RANGES pour vos tranches horaires
+    - ADAPTIVE_MODE, WAKE_UP_LEAD_SECONDS et MAX_SLEEP_MINUTES pour le mode adaptatif
 """
 
 import requests
@@ -35,6 +39,12 @@ ACTIVE_TIME_RANGES = [
 # Si True, le script tournera 24/7
 # Si False, il respectera les ACTIVE_TIME_RANGES
 ALWAYS_ACTIVE = False
+
+# Mode adaptatif : réveil calé sur la prochaine publication due (ignore les tranches horaires)
+ADAPTIVE_MODE = True
+WAKE_UP_LEAD_SECONDS = 90  # Réveil avant l'échéance (laisse au serveur Render le temps de démarrer)
+MAX_SLEEP_MINUTES = 30  # Plafond : revérifie au moins à cette fréquence (posts créés entre-temps)
+MIN_SLEEP_SECONDS = 15
 # ===================================
 
 
@@ -86,6 +96,13 @@ def ping_server():
         print(f"[{timestamp}] ⏸️  Hors période active - Prochaine: {next_period}")
         return
     
+    trigger_catch_up()
+
+
+def trigger_catch_up():
+    """Déclenche le rattrapage des publications en attente sur le serveur."""
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    
     try:
         # Vérifier les publications en attente
         response = requests.post(
@@ -111,15 +128,92 @@ def ping_server():
         print(f"[{timestamp}] ✗ Erreur: {e}")
 
 
+def fetch_next_due():
+    """
+    Interroge /posts/next-due (réveille aussi le serveur).
+    Retourne (heure serveur, prochaine échéance ou None), ou None en cas d'erreur.
+    """
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    try:
+        response = requests.get(f"{SERVER_URL}/posts/next-due", timeout=60)
+        if response.status_code != 200:
+            print(f"[{timestamp}] ⚠ Réponse inattendue (next-due): {response.status_code}")
+            return None
+        data = response.json()
+        server_time = datetime.fromisoformat(data["server_time"])
+        next_due_at = datetime.fromisoformat(data["next_due_at"]) if data["next_due_at"] else None
+        return server_time, next_due_at
+    except (requests.exceptions.RequestException, ValueError, KeyError) as e:
+        print(f"[{timestamp}] ✗ Erreur lors de la lecture de la prochaine échéance: {e}")
+        return None
+
+
+def compute_sleep_seconds(server_time, next_due_at):
+    """Durée de sommeil jusqu'à WAKE_UP_LEAD_SECONDS avant l'échéance, bornée par le plafond."""
+    max_sleep = MAX_SLEEP_MINUTES * 60
+    if next_due_at is None:
+        return max_sleep
+    seconds = (next_due_at - server_time).total_seconds() - WAKE_UP_LEAD_SECONDS
+    return max(MIN_SLEEP_SECONDS, min(seconds, max_sleep))
+
+
+def run_adaptive():
+    """Boucle du mode adaptatif : dort jusqu'à la prochaine échéance puis déclenche le rattrapage."""
+    last_caught_up_due = None
+    while True:
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        info = fetch_next_due()
+        
+        if info is None:
+            # Serveur injoignable : on réessaie plus tard sans marteler
+            time.sleep(INTERVAL_MINUTES * 60)
+            continue
+        
+        server_time, next_due_at = info
+        
+        if next_due_at is not None and next_due_at == last_caught_up_due:
+            # Le rattrapage n'a pas fait avancer l'échéance : on évite de boucler
+            print(f"[{timestamp}] ⚠ Publication du {next_due_at} UTC toujours en attente - nouvel essai dans {INTERVAL_MINUTES} min")
+            last_caught_up_due = None
+            time.sleep(INTERVAL_MINUTES * 60)
+            continue
+        
+        if next_due_at is not None and (next_due_at - server_time).total_seconds() <= WAKE_UP_LEAD_SECONDS:
+            # Échéance imminente (ou dépassée) : le serveur est éveillé, on attend l'heure puis on rattrape
+            wait = max(0, (next_due_at - server_time).total_seconds()) + 5
+            print(f"[{timestamp}] ⏰ Publication due à {next_due_at} UTC - rattrapage dans {int(wait)}s")
+            time.sleep(wait)
+            trigger_catch_up()
+            last_caught_up_due = next_due_at
+            continue
+        
+        sleep_seconds = compute_sleep_seconds(server_time, next_due_at)
+        next_label = f"{next_due_at} UTC" if next_due_at else "aucune"
+        print(f"[{timestamp}] 💤 Prochaine publication: {next_label} - réveil dans {int(sleep_seconds // 60)} min")
+        time.sleep(sleep_seconds)
+
+
 def main():
     """Lance le système de keep-alive."""
     print("=" * 60)
     print("  MEDIA AUTO PUBLISH - Keep Alive Service")
     print("=" * 60)
     print(f"Serveur cible: {SERVER_URL}")
-    print(f"Intervalle: toutes les {INTERVAL_MINUTES} minutes")
     print(f"Démarré le: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     
+    if ADAPTIVE_MODE:
+        print(f"Mode: ADAPTATIF (réveil {WAKE_UP_LEAD_SECONDS}s avant chaque échéance, max {MAX_SLEEP_MINUTES} min de sommeil)")
+        print("=" * 60)
+        print("\nAppuyez sur Ctrl+C pour arrêter\n")
+        try:
+            # Rattrape d'abord ce qui aurait été manqué avant le lancement
+            trigger_catch_up()
+            run_adaptive()
+        except KeyboardInterrupt:
+            print("\n\n[ARRÊT] Service Keep-Alive arrêté par l'utilisateur")
+        return
+    
+    print(f"Intervalle: toutes les {INTERVAL_MINUTES} minutes")
     if ALWAYS_ACTIVE:
         print(f"Mode: ACTIF 24/7")
     else:
@@ -1,9 +1,11 @@
 from fastapi import FastAPI
 from contextlib import asynccontextmanager
-from database import init_db
+from config import settings
+from database import init_db, engine, async_engine
 from scheduler_service import start_scheduler, scheduler
 from routers import auth, posts
 from migrations import run_migrations
+from events import start_event_bridge, stop_event_bridge
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -12,11 +14,14 @@ async def lifespan(app: FastAPI):
     init_db()
     run_migrations() # Exécuter les migrations
     start_scheduler()
+    start_event_bridge()
     yield
     # Shutdown
     print("Arrêt de l'application...")
+    stop_event_bridge()
     if scheduler.running:
         scheduler.shutdown()
+    await async_engine.dispose()
 
 app = FastAPI(
     title="Media Auto Publish API",
@@ -50,6 +55,16 @@ app.add_middleware(
 app.include_router(auth.router)
 app.include_router(posts.router)
 
+# --- Profilage à la demande : rien n'est installé s'il est désactivé ---
+if settings.PROFILING_ENABLED:
+    from profiling import ProfilingMiddleware, install_request_tracking, install_sql_tracking
+    from routers import debug
+
+    install_sql_tracking(engine, async_engine.sync_engine)
+    install_request_tracking()
+    app.add_middleware(ProfilingMiddleware)
+    app.include_router(debug.router)
+
 @app.get("/")
 def read_root():
     return {"message": "Bienvenue sur l'API Media Auto Publish"}
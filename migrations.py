@@ -1,6 +1,117 @@
-from sqlalchemy import text
+from sqlalchemy import bindparam, text, inspect
+from config import settings
 from database import engine
 
+def _add_column_if_missing(connection, table: str, column: str, ddl: str):
+    """Ajoute une colonne à une table existante si elle n'existe pas encore."""
+    columns = [c["name"] for c in inspect(connection).get_columns(table)]
+    if column not in columns:
+        print(f"Migration: Ajout de la colonne {table}.{column}...")
+        connection.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+        connection.commit()
+
+def _create_index_if_missing(connection, name: str, table: str, columns: str):
+    """Crée un index sur une table existante (create_all ne le fait pas pour les tables déjà créées)."""
+    connection.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})"))
+    connection.commit()
+
+# Triggers qui tiennent à jour la table FTS5 posts_fts (SQLite)
+_SQLITE_FTS_TRIGGERS = [f"{table}_fts_{event}" for table in ("posts", "posts_archive") for event in ("insert", "update", "delete")]
+
+def _drop_sqlite_full_text_search(connection):
+    for trigger in _SQLITE_FTS_TRIGGERS:
+        connection.execute(text(f"DROP TRIGGER IF EXISTS {trigger}"))
+    connection.execute(text("DROP TABLE IF EXISTS posts_fts"))
+
+def _enable_sqlite_autoincrement(connection):
+    """
+    Reconstruit la table posts en AUTOINCREMENT (SQLite ne sait pas modifier une clé primaire) :
+    sans cela, l'id d'un post archivé peut être réattribué à un nouveau post.
+    L'index plein texte est supprimé puis recréé par _setup_full_text_search.
+    """
+    from models import Post
+    if connection.dialect.name != "sqlite":
+        return
+    table_sql = connection.execute(text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'posts'")).scalar()
+    if not table_sql or "AUTOINCREMENT" in table_sql.upper():
+        return
+    print("Migration: Reconstruction de la table posts en AUTOINCREMENT...")
+    # pysqlite n'ouvre pas de transaction avant un ordre DDL : BEGIN explicite, tout ou rien
+    if not connection.connection.driver_connection.in_transaction:
+        connection.exec_driver_sql("BEGIN")
+    _drop_sqlite_full_text_search(connection)
+    index_names = [index["name"] for index in inspect(connection).get_indexes("posts")]
+    connection.execute(text("ALTER TABLE posts RENAME TO posts_old"))
+    for name in index_names:
+        connection.execute(text(f"DROP INDEX IF EXISTS {name}"))
+    Post.__table__.create(connection)
+    columns = ", ".join(c["name"] for c in inspect(connection).get_columns("posts_old") if c["name"] in Post.__table__.c)
+    connection.execute(text(f"INSERT INTO posts ({columns}) SELECT {columns} FROM posts_old"))
+    connection.execute(text("DROP TABLE posts_old"))
+    # Les prochains ids partent au-delà des ids déjà attribués, archivés compris
+    connection.execute(text("DELETE FROM sqlite_sequence WHERE name = 'posts'"))
+    connection.execute(text(
+        "INSERT INTO sqlite_sequence (name, seq) SELECT 'posts', max("
+        "coalesce((SELECT max(id) FROM posts), 0), coalesce((SELECT max(id) FROM posts_archive), 0))"
+    ))
+    connection.commit()
+
+def _setup_full_text_search(connection):
+    """
+    Index plein texte sur le titre et le contenu des posts (tables posts et posts_archive) :
+    colonne tsvector générée + index GIN sous Postgres, table FTS5 tenue à jour par triggers sous SQLite.
+    """
+    if connection.dialect.name == "postgresql":
+        document = "coalesce(title, '') || ' ' || coalesce(text_content, '')"
+        for table in ("posts", "posts_archive"):
+            connection.execute(text(
+                f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS search_vector tsvector "
+                f"GENERATED ALWAYS AS (to_tsvector('{settings.SEARCH_LANGUAGE}', {document})) STORED"
+            ))
+            connection.execute(text(f"CREATE INDEX IF NOT EXISTS ix_{table}_search_vector ON {table} USING GIN (search_vector)"))
+        connection.commit()
+    elif connection.dialect.name == "sqlite":
+        expected = {"posts_fts", *_SQLITE_FTS_TRIGGERS}
+        existing = set(connection.execute(
+            text("SELECT name FROM sqlite_master WHERE name IN :names").bindparams(bindparam("names", expanding=True)),
+            {"names": list(expected)},
+        ).scalars())
+        if existing == expected:
+            return
+        print("Migration: Création de l'index plein texte posts_fts...")
+        # Tout ou rien (pysqlite n'ouvre pas de transaction avant un ordre DDL) : un index laissé
+        # incomplet par un démarrage interrompu est supprimé puis entièrement reconstruit
+        if not connection.connection.driver_connection.in_transaction:
+            connection.exec_driver_sql("BEGIN")
+        _drop_sqlite_full_text_search(connection)
+        connection.execute(text(
+            "CREATE VIRTUAL TABLE posts_fts USING fts5("
+            "user_id UNINDEXED, title, text_content, tokenize = 'unicode61 remove_diacritics 2')"
+        ))
+        upsert = (
+            "INSERT OR REPLACE INTO posts_fts (rowid, user_id, title, text_content) "
+            "VALUES (new.id, new.user_id, new.title, new.text_content)"
+        )
+        for table in ("posts", "posts_archive"):
+            connection.execute(text(f"CREATE TRIGGER {table}_fts_insert AFTER INSERT ON {table} BEGIN {upsert}; END"))
+            connection.execute(text(
+                f"CREATE TRIGGER {table}_fts_update AFTER UPDATE OF title, text_content ON {table} BEGIN {upsert}; END"
+            ))
+            connection.execute(text(
+                f"INSERT OR REPLACE INTO posts_fts (rowid, user_id, title, text_content) "
+                f"SELECT id, user_id, title, text_content FROM {table}"
+            ))
+        # L'archivage copie le post dans posts_archive avant de le supprimer de posts : l'entrée est conservée
+        connection.execute(text(
+            "CREATE TRIGGER posts_fts_delete AFTER DELETE ON posts BEGIN "
+            "DELETE FROM posts_fts WHERE rowid = old.id AND NOT EXISTS (SELECT 1 FROM posts_archive WHERE id = old.id); END"
+        ))
+        connection.execute(text(
+            "CREATE TRIGGER posts_archive_fts_delete AFTER DELETE ON posts_archive BEGIN "
+            "DELETE FROM posts_fts WHERE rowid = old.id; END"
+        ))
+        connection.commit()
+
 def run_migrations():
     print("Vérification des migrations...")
     with engine.connect() as connection:
@@ -19,3 +130,38 @@ def run_migrations():
         except Exception as e:
             print(f"Erreur lors de la migration: {e}")
             # On ne bloque pas le démarrage si la migration échoue (peut-être déjà faite ou autre DB)
+            connection.rollback()
+
+        try:
+            # Groupes de posts multi-plateformes
+            _add_column_if_missing(connection, "posts", "group_id", "INTEGER REFERENCES post_groups(id)")
+            _create_index_if_missing(connection, "ix_posts_group_id", "posts", "group_id")
+            # Séries récurrentes
+            _add_column_if_missing(connection, "posts", "series_id", "INTEGER REFERENCES post_series(id)")
+            _add_column_if_missing(connection, "post_series", "tzid", "VARCHAR NOT NULL DEFAULT 'UTC'")
+            _create_index_if_missing(connection, "ix_posts_series_id", "posts", "series_id")
+            # Requête du prochain post dû (/posts/next-due) et rattrapage
+            _create_index_if_missing(connection, "ix_posts_status_scheduled_at", "posts", "status, scheduled_at")
+            # Réservations de publication (reprise des posts bloqués en 'publishing')
+            _add_column_if_missing(connection, "posts", "claimed_at", "TIMESTAMP")
+            # Reprise des clés d'idempotence restées 'in_progress' (arrêt pendant la requête)
+            _add_column_if_missing(connection, "idempotency_keys", "reserved_at", "TIMESTAMP")
+            # Empreinte du corps : une clé rejouée avec un autre contenu est refusée
+            _add_column_if_missing(connection, "idempotency_keys", "request_hash", "VARCHAR")
+        except Exception as e:
+            print(f"Erreur lors de la migration: {e}")
+            connection.rollback()
+
+        try:
+            # Ids des posts jamais réutilisés (SQLite), avant la création de l'index plein texte
+            _enable_sqlite_autoincrement(connection)
+        except Exception as e:
+            print(f"Erreur lors de la reconstruction de la table posts: {e}")
+            connection.rollback()
+
+        try:
+            # Recherche plein texte (/posts/search)
+            _setup_full_text_search(connection)
+        except Exception as e:
+            print(f"Erreur lors de la création de l'index plein texte: {e}")
+            connection.rollback()
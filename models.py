@@ -1,5 +1,6 @@
 from typing import Optional
 from datetime import datetime
+from sqlalchemy import Index
 from sqlmodel import Field, SQLModel
 
 class User(SQLModel, table=True):
@@ -10,10 +11,49 @@ class User(SQLModel, table=True):
     is_active: bool = Field(default=True)
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
+class PostGroup(SQLModel, table=True):
+    """Un même contenu publié sur plusieurs plateformes (un Post par plateforme)."""
+    __tablename__ = "post_groups"
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: int = Field(foreign_key="users.id")
+    title: Optional[str] = None
+    text_content: str
+    scheduled_at: datetime
+    status: str = Field(default="scheduled")  # scheduled, published, partial, failed
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+class PostSeries(SQLModel, table=True):
+    """
+    Série récurrente (règle RRULE). Seule la prochaine occurrence est programmée :
+    les occurrences futures sont calculées à la volée, un Post n'est créé qu'à la publication.
+    """
+    __tablename__ = "post_series"
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: int = Field(foreign_key="users.id")
+    platform: str = Field(default="linkedin")
+    title: Optional[str] = None
+    text_content: str
+    image_url: Optional[str] = None
+    rrule: str  # ex: "FREQ=WEEKLY;BYDAY=MO;BYHOUR=9;BYMINUTE=0"
+    dtstart: datetime  # UTC, à la minute
+    tzid: str = Field(default="UTC")  # Fuseau IANA dans lequel s'applique la règle (ex: "Europe/Paris")
+    next_occurrence_at: Optional[datetime] = Field(default=None, index=True)  # None = série terminée
+    status: str = Field(default="active")  # active, paused, ended
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
 class Post(SQLModel, table=True):
     __tablename__ = "posts"
+    __table_args__ = (
+        # Sert les requêtes "prochain post programmé" et "posts en retard" (MIN / plage sur scheduled_at)
+        Index("ix_posts_status_scheduled_at", "status", "scheduled_at"),
+        # Sous SQLite, un id libéré (post archivé ou supprimé) ne doit pas être réattribué :
+        # posts_archive et l'index plein texte conservent l'id des posts archivés
+        {"sqlite_autoincrement": True},
+    )
     id: Optional[int] = Field(default=None, primary_key=True)
     user_id: int = Field(foreign_key="users.id")
+    group_id: Optional[int] = Field(default=None, foreign_key="post_groups.id", index=True)
+    series_id: Optional[int] = Field(default=None, foreign_key="post_series.id", index=True)
     platform: str = Field(default="linkedin")
     title: Optional[str] = None
     text_content: str
@@ -22,3 +62,42 @@ class Post(SQLModel, table=True):
     status: str = Field(default="scheduled")
     created_at: datetime = Field(default_factory=datetime.utcnow)
     error_message: Optional[str] = None
+    claimed_at: Optional[datetime] = None  # Passage à 'publishing' (reprise après arrêt brutal)
+
+class ArchivedPost(SQLModel, table=True):
+    """
+    Post publié ou en échec déplacé hors de la table posts par archival.archive_old_posts.
+    Mêmes colonnes (et même id, jamais réattribué à un nouveau post) que Post, sans clés étrangères vers les groupes et séries.
+    """
+    __tablename__ = "posts_archive"
+    __table_args__ = (
+        Index("ix_posts_archive_user_id_scheduled_at", "user_id", "scheduled_at"),
+    )
+    id: int = Field(primary_key=True)
+    user_id: int = Field(foreign_key="users.id")
+    group_id: Optional[int] = Field(default=None, index=True)
+    series_id: Optional[int] = Field(default=None, index=True)
+    platform: str = Field(default="linkedin")
+    title: Optional[str] = None
+    text_content: str
+    image_url: Optional[str] = None
+    scheduled_at: datetime
+    status: str
+    created_at: datetime
+    error_message: Optional[str] = None
+    claimed_at: Optional[datetime] = None
+    archived_at: datetime = Field(default_factory=datetime.utcnow)
+
+class IdempotencyKey(SQLModel, table=True):
+    """Réponse mémorisée pour un en-tête Idempotency-Key, rejouée si le client renvoie la requête."""
+    __tablename__ = "idempotency_keys"
+    key: str = Field(primary_key=True)  # "<scope>:<clé client>"
+    request_path: str
+    request_hash: Optional[str] = None  # sha256 du corps de la requête (forme canonique)
+    status: str = Field(default="in_progress")  # in_progress, completed
+    status_code: Optional[int] = None
+    response_body: Optional[str] = None  # JSON
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    # Début du traitement en cours : au-delà de PUBLISH_CLAIM_TIMEOUT_MINUTES, la requête est considérée interrompue
+    reserved_at: Optional[datetime] = Field(default_factory=datetime.utcnow)
+    expires_at: datetime = Field(index=True)
@@ -0,0 +1,164 @@
+import csv
+import io
+import json
+import queue
+from datetime import datetime, timezone
+from itertools import islice
+from typing import Iterator, Optional
+from pydantic import TypeAdapter
+from sqlmodel import Session, select, union_all
+from config import settings
+from database import engine
+from models import Post, ArchivedPost
+
+# Export / import de compte : les lignes circulent une à une (curseur côté serveur à l'export,
+# lecture incrémentale du corps à l'import), la mémoire utilisée ne dépend pas du nombre de posts.
+
+EXPORT_FIELDS = [
+    "id", "platform", "title", "text_content", "image_url",
+    "scheduled_at", "status", "created_at", "error_message", "group_id", "series_id",
+]
+IMPORTABLE_STATUSES = ('scheduled', 'published', 'failed')
+TEXT_FIELDS = ("platform", "title", "text_content", "image_url", "status", "error_message")
+MAX_REPORTED_ERRORS = 100
+
+def export_query(user_id: int):
+    """Posts de l'utilisateur, table chaude puis archive, en colonnes brutes (pas de modèles ORM)."""
+    columns = lambda model: [model.__table__.c[name] for name in EXPORT_FIELDS]
+    return union_all(
+        select(*columns(Post)).where(Post.user_id == user_id),
+        select(*columns(ArchivedPost)).where(ArchivedPost.user_id == user_id),
+    ).order_by("id")
+
+def _export_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+def format_rows(rows: list, export_format: str, header: bool = False) -> str:
+    """Sérialise un paquet de lignes en NDJSON ou CSV (avec l'en-tête pour le premier paquet CSV)."""
+    if export_format == "ndjson":
+        return "".join(
+            json.dumps({name: _export_value(value) for name, value in zip(EXPORT_FIELDS, row)}, ensure_ascii=False) + "\n"
+            for row in rows
+        )
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(EXPORT_FIELDS)
+    writer.writerows([_export_value(value) for value in row] for row in rows)
+    return buffer.getvalue()
+
+def iter_queued_lines(chunks: queue.Queue) -> Iterator[str]:
+    """Lignes reçues de la requête (paquets de lignes déposés dans la file, None en fin de corps)."""
+    while True:
+        lines = chunks.get()
+        if lines is None:
+            return
+        yield from lines
+
+def _parse_rows(lines: Iterator[str], import_format: str) -> Iterator[tuple[int, Optional[dict], Optional[str]]]:
+    """Produit (numéro de ligne, données, erreur de syntaxe)."""
+    if import_format == "csv":
+        reader = csv.DictReader(lines)
+        for row in reader:
+            yield reader.line_num, {key: (value if value != "" else None) for key, value in row.items()}, None
+        return
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+        except ValueError as e:
+            yield line_number, None, f"JSON invalide : {e}"
+            continue
+        if not isinstance(data, dict):
+            yield line_number, None, "Objet JSON attendu."
+            continue
+        yield line_number, data, None
+
+_datetime_adapter = TypeAdapter(datetime)
+
+def _as_naive_utc(value) -> datetime:
+    """Date ISO (avec ou sans fuseau) -> datetime UTC naïf, convention de la base."""
+    parsed = _datetime_adapter.validate_python(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+def _build_post(data: dict, user_id: int, platforms, now: datetime) -> Post:
+    """Valide une ligne importée. Lève ValueError avec un message lisible."""
+    for field in TEXT_FIELDS:
+        if data.get(field) is not None and not isinstance(data[field], str):
+            raise ValueError(f"{field} doit être une chaîne.")
+    if not data.get("text_content"):
+        raise ValueError("text_content manquant.")
+    if not data.get("scheduled_at"):
+        raise ValueError("scheduled_at manquant.")
+    platform = data.get("platform") or "linkedin"
+    if platform not in platforms:
+        raise ValueError(f"Plateforme '{platform}' non supportée.")
+    status = data.get("status") or "scheduled"
+    if status not in IMPORTABLE_STATUSES:
+        raise ValueError(f"Statut '{status}' non importable.")
+    try:
+        scheduled_at = _as_naive_utc(data["scheduled_at"])
+    except Exception:
+        raise ValueError(f"scheduled_at invalide : {data['scheduled_at']!r}")
+
+    post = Post(
+        user_id=user_id,
+        platform=platform,
+        title=data.get("title"),
+        text_content=data["text_content"],
+        image_url=data.get("image_url"),
+        scheduled_at=scheduled_at,
+        status=status,
+        error_message=data.get("error_message"),
+    )
+    # Un post programmé dont la date est passée n'est pas publié d'office par le rattrapage
+    if post.status == 'scheduled' and post.scheduled_at <= now:
+        post.status = 'failed'
+        post.error_message = "Date de publication dépassée lors de l'import."
+    return post
+
+def import_posts(lines: Iterator[str], import_format: str, user_id: int, platforms, schedule_due) -> dict:
+    """
+    Insère les posts par paquets de IMPORT_CHUNK_SIZE (un commit par paquet) et programme ceux à venir.
+    Pas de job par post : `schedule_due` reçoit la première échéance du paquet, la publication de
+    tous les posts dus se reprogramme ensuite d'échéance en échéance.
+    Exécuté dans un thread : `lines` est alimenté au fil de la lecture du corps de la requête.
+    """
+    imported = 0
+    scheduled = 0
+    errors = []
+    error_count = 0
+    now = datetime.utcnow()
+    rows = _parse_rows(lines, import_format)
+
+    with Session(engine) as session:
+        while True:
+            chunk = list(islice(rows, settings.IMPORT_CHUNK_SIZE))
+            if not chunk:
+                break
+            posts = []
+            for line_number, data, error in chunk:
+                if error is None:
+                    try:
+                        posts.append(_build_post(data, user_id, platforms, now))
+                        continue
+                    except ValueError as e:
+                        error = str(e)
+                error_count += 1
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    errors.append({"line": line_number, "error": error})
+
+            session.add_all(posts)
+            # Lues avant le commit, qui expire les objets (pas de rechargement post par post)
+            due_dates = [post.scheduled_at for post in posts if post.status == 'scheduled']
+            session.commit()
+            session.expunge_all()
+            if due_dates:
+                schedule_due(min(due_dates))
+            scheduled += len(due_dates)
+            imported += len(posts)
+
+    return {"imported": imported, "scheduled": scheduled, "rejected": error_count, "errors": errors}
@@ -0,0 +1,74 @@
+import hashlib
+import json
+import threading
+from typing import Optional
+from urllib.parse import urlparse
+import requests
+from config import settings
+
+# Pré-vérification des posts proches de leur échéance (job preflight_due_posts du scheduler) :
+# le payload est construit et mis en cache à l'avance, l'image est sollicitée une première fois
+# (le CDN la génère / la met en cache) et la connexion au webhook est ouverte. À l'échéance,
+# l'envoi reprend le payload préparé s'il correspond toujours au contenu du post.
+
+PREFLIGHT_PREFIX = "Pré-vérification : "
+
+_prepared = {}  # post_id -> (empreinte du contenu, payload)
+_prepared_lock = threading.Lock()
+
+def content_fingerprint(platform: str, title, text, image_url) -> str:
+    return hashlib.sha256(json.dumps([platform, title, text, image_url]).encode()).hexdigest()
+
+def is_prepared(post_id: int, fingerprint: str) -> bool:
+    with _prepared_lock:
+        entry = _prepared.get(post_id)
+    return entry is not None and entry[0] == fingerprint
+
+def store_payload(post_id: int, fingerprint: str, payload: dict):
+    with _prepared_lock:
+        _prepared[post_id] = (fingerprint, payload)
+
+def take_prepared_payload(post_id: int, platform: str, title, text, image_url) -> Optional[dict]:
+    """Retire le payload préparé du post. None s'il n'y en a pas ou si le post a été modifié depuis."""
+    with _prepared_lock:
+        entry = _prepared.pop(post_id, None)
+    if entry is None or entry[0] != content_fingerprint(platform, title, text, image_url):
+        return None
+    return entry[1]
+
+def retain_prepared(post_ids: set):
+    """Oublie les payloads des posts qui ne sont plus à venir (supprimés, publiés par une autre instance...)."""
+    with _prepared_lock:
+        for post_id in set(_prepared) - post_ids:
+            del _prepared[post_id]
+
+def _is_checkable_image(image_url: str) -> bool:
+    """
+    Seules les images https hébergées sur PREFLIGHT_IMAGE_HOSTS (Cloudinary, où ce backend les dépose)
+    sont sollicitées : une URL quelconque fournie par un utilisateur ne doit pas faire interroger
+    au serveur des adresses internes (métadonnées cloud, ports locaux...).
+    """
+    parsed = urlparse(image_url)
+    return parsed.scheme == "https" and (parsed.hostname or "").lower() in settings.PREFLIGHT_IMAGE_HOSTS
+
+def check_image(image_url: str) -> Optional[str]:
+    """None si l'image est accessible (ou hors du périmètre vérifié), sinon la raison du problème."""
+    if not image_url.startswith(('http://', 'https://')):
+        return "l'image n'est pas une URL publique."
+    if not _is_checkable_image(image_url):
+        return None
+    timeout = settings.PREFLIGHT_IMAGE_TIMEOUT
+    # Pas de redirection suivie : elle pourrait mener hors des hôtes autorisés.
+    # Le détail (statut, exception) reste dans les logs, le post ne reçoit qu'un message générique.
+    try:
+        response = requests.head(image_url, timeout=timeout, allow_redirects=False)
+        if response.status_code in (403, 405, 501):  # Certains serveurs refusent HEAD
+            with requests.get(image_url, timeout=timeout, stream=True, allow_redirects=False) as response:
+                pass
+    except requests.exceptions.RequestException as e:
+        print(f"Pré-vérification : image {image_url} injoignable ({e})")
+        return "image injoignable."
+    if response.status_code >= 300:
+        print(f"Pré-vérification : image {image_url} -> HTTP {response.status_code}")
+        return "image inaccessible."
+    return None
@@ -0,0 +1,243 @@
+import asyncio
+import contextvars
+import hmac
+import itertools
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+from typing import Optional
+import anyio.to_thread
+from sqlalchemy import event
+from config import settings
+
+# Profilage à la demande (PROFILING_ENABLED) : une requête est profilée si elle porte l'en-tête
+# X-Profile-Token (= PROFILING_TOKEN) ou si elle est tirée au sort (PROFILING_SAMPLE_RATE).
+# Un thread échantillonne toutes les PROFILING_INTERVAL_MS les piles de la requête seulement : la boucle
+# asyncio quand elle exécute une tâche de la requête, et les threads du pool AnyIO qui travaillent pour elle
+# (les threads lancés par ceux-ci, envois de webhooks en parallèle par exemple, n'y figurent pas).
+# Profil en temps écoulé : un thread de la requête bloqué (webhook, verrou) y apparaît avec son attente.
+# Format "folded" (pile;pile;pile nombre), lisible par flamegraph.pl ou speedscope.
+# Désactivé, ni le middleware ni les écouteurs SQL ne sont installés (main.py).
+
+PROFILE_HEADER = b"x-profile-token"
+MAX_SQL_STATEMENTS = 20
+
+_current_profile = contextvars.ContextVar("current_profile", default=None)
+_profiles = deque(maxlen=settings.PROFILING_HISTORY)
+_profiles_lock = threading.Lock()
+_profile_ids = itertools.count(1)
+
+def token_matches(token: Optional[str]) -> bool:
+    return bool(settings.PROFILING_TOKEN and token) and hmac.compare_digest(token, settings.PROFILING_TOKEN)
+
+class _StackSampler(threading.Thread):
+    def __init__(self, profile: dict, loop: asyncio.AbstractEventLoop, interval: float):
+        super().__init__(name="profiling-sampler", daemon=True)
+        self.profile = profile
+        self.loop = loop
+        self.loop_ident = threading.get_ident()  # Créé depuis la boucle asyncio
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stopped = threading.Event()
+
+    def _belongs_to_request(self, ident: int) -> bool:
+        if ident == self.loop_ident:
+            # La boucle exécute aussi les autres requêtes : seulement quand la tâche courante est à nous
+            return asyncio.current_task(self.loop) in self.profile["tasks"]
+        return ident in self.profile["threads"]
+
+    def run(self):
+        thread_names = {}
+        while not self._stopped.wait(self.interval):
+            self.samples += 1
+            for ident, frame in sys._current_frames().items():
+                if not self._belongs_to_request(ident):
+                    continue
+                if ident not in thread_names:
+                    thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(thread_names.get(ident, str(ident)))
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+def _record_sql(profile: dict, statement: str, elapsed_ms: float):
+    sql = profile["sql"]
+    sql["count"] += 1
+    sql["total_ms"] += elapsed_ms
+    key = " ".join(statement.split())[:300]
+    stats = sql["statements"].setdefault(key, {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+    stats["count"] += 1
+    stats["total_ms"] += elapsed_ms
+    stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_profile.get() is not None:
+        conn.info.setdefault("profiling_started", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _current_profile.get()
+    if profile is None or not conn.info.get("profiling_started"):
+        return
+    elapsed_ms = (time.perf_counter() - conn.info["profiling_started"].pop()) * 1000
+    with profile["lock"]:
+        if isinstance(profile["sql"]["statements"], dict):  # Profil pas encore finalisé
+            _record_sql(profile, statement, elapsed_ms)
+
+def install_sql_tracking(*engines):
+    """Compte et chronomètre les requêtes SQL des requêtes profilées (contexte propagé aux threads du pool)."""
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+_run_sync = anyio.to_thread.run_sync
+
+async def _run_sync_tracked(func, *args, **kwargs):
+    """anyio.to_thread.run_sync (run_in_threadpool, dépendances et routes synchrones) : le thread est rattaché à la requête profilée."""
+    profile = _current_profile.get()
+    if profile is None:
+        return await _run_sync(func, *args, **kwargs)
+
+    def tracked(*func_args):
+        ident = threading.get_ident()
+        with profile["lock"]:
+            profile["threads"][ident] += 1
+        try:
+            return func(*func_args)
+        finally:
+            with profile["lock"]:
+                profile["threads"][ident] -= 1
+                if not profile["threads"][ident]:
+                    del profile["threads"][ident]
+
+    return await _run_sync(tracked, *args, **kwargs)
+
+def _tracking_task_factory(previous_factory):
+    """Les tâches créées pendant une requête profilée (réponses en streaming...) lui sont rattachées."""
+    def factory(loop, coro, **kwargs):
+        task = previous_factory(loop, coro, **kwargs) if previous_factory else asyncio.Task(coro, loop=loop, **kwargs)
+        profile = _current_profile.get()
+        if profile is not None:
+            profile["tasks"].add(task)
+        return task
+    factory.tracks_profiles = True
+    return factory
+
+def install_request_tracking():
+    """Rattache aux requêtes profilées les threads du pool qui travaillent pour elles."""
+    anyio.to_thread.run_sync = _run_sync_tracked
+
+def _track_loop_tasks(loop: asyncio.AbstractEventLoop):
+    factory = loop.get_task_factory()
+    if not getattr(factory, "tracks_profiles", False):
+        loop.set_task_factory(_tracking_task_factory(factory))
+
+def _header(scope, name: bytes) -> Optional[str]:
+    for key, value in scope.get("headers", []):
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+def _trigger(scope) -> Optional[str]:
+    if scope["path"].startswith("/debug/"):
+        return None
+    if token_matches(_header(scope, PROFILE_HEADER)):
+        return "header"
+    if (
+        settings.PROFILING_SAMPLE_RATE > 0
+        and not scope["path"].startswith("/posts/events")
+        and random.random() < settings.PROFILING_SAMPLE_RATE
+    ):
+        return "sample"
+    return None
+
+class ProfilingMiddleware:
+    """Middleware ASGI : profile les requêtes sélectionnées, laisse passer les autres sans surcoût."""
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        trigger = _trigger(scope) if scope["type"] == "http" else None
+        if trigger is None:
+            return await self.app(scope, receive, send)
+
+        profile = {
+            "method": scope["method"],
+            "path": scope["path"],
+            "query": scope.get("query_string", b"").decode("latin-1"),
+            "trigger": trigger,
+            "started_at": datetime.utcnow().isoformat(),
+            "status_code": None,
+            "sql": {"count": 0, "total_ms": 0.0, "statements": {}},
+            "lock": threading.Lock(),
+            "tasks": {asyncio.current_task()},
+            "threads": Counter(),  # ident -> appels en cours pour la requête
+        }
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                profile["status_code"] = message["status"]
+            await send(message)
+
+        loop = asyncio.get_running_loop()
+        _track_loop_tasks(loop)
+        sampler = _StackSampler(profile, loop, settings.PROFILING_INTERVAL_MS / 1000)
+        context_token = _current_profile.set(profile)
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            duration_ms = (time.perf_counter() - started) * 1000
+            sampler.stop()
+            _current_profile.reset(context_token)
+            _store(profile, sampler, duration_ms)
+
+def _store(profile: dict, sampler: _StackSampler, duration_ms: float):
+    sql = profile["sql"]
+    # Une tâche ou un thread de la requête encore actif peut s'y rattacher : conteneurs vidés, pas retirés
+    profile["tasks"], profile["threads"] = set(), Counter()
+    with profile["lock"]:
+        sql["total_ms"] = round(sql["total_ms"], 2)
+        top = sorted(sql["statements"].items(), key=lambda item: item[1]["total_ms"], reverse=True)[:MAX_SQL_STATEMENTS]
+        sql["statements"] = [
+            {"statement": statement, "count": stats["count"], "total_ms": round(stats["total_ms"], 2), "max_ms": round(stats["max_ms"], 2)}
+            for statement, stats in top
+        ]
+    profile.update({
+        "duration_ms": round(duration_ms, 2),
+        "interval_ms": settings.PROFILING_INTERVAL_MS,
+        "samples": sampler.samples,
+        "folded": "\n".join(f"{stack} {count}" for stack, count in sampler.stacks.most_common()),
+    })
+    with _profiles_lock:
+        profile["id"] = next(_profile_ids)
+        _profiles.append(profile)
+    print(f"Profil #{profile['id']} : {profile['method']} {profile['path']} {profile['duration_ms']} ms, {sql['count']} requête(s) SQL")
+
+INTERNAL_FIELDS = ("lock", "tasks", "threads")
+SUMMARY_FIELDS = ("id", "method", "path", "status_code", "trigger", "started_at", "duration_ms", "samples")
+
+def list_profiles() -> list[dict]:
+    """Résumé des derniers profils, du plus récent au plus ancien."""
+    with _profiles_lock:
+        return [
+            {**{key: profile[key] for key in SUMMARY_FIELDS}, "sql_count": profile["sql"]["count"], "sql_total_ms": profile["sql"]["total_ms"]}
+            for profile in reversed(_profiles)
+        ]
+
+def get_profile(profile_id: int) -> Optional[dict]:
+    with _profiles_lock:
+        profile = next((profile for profile in _profiles if profile["id"] == profile_id), None)
+    return {key: value for key, value in profile.items() if key not in INTERNAL_FIELDS} if profile else None
@@ -0,0 +1,85 @@
+import re
+from datetime import datetime, timedelta, timezone
+from itertools import islice
+from typing import Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from dateutil.rrule import rrulestr
+
+# Nombre max d'occurrences calculées pour un affichage (calendrier, liste)
+MAX_LISTED_OCCURRENCES = 500
+# Chaque occurrence appelle le webhook et crée un Post : pas plus d'une par heure.
+# Les calculs parcourent la règle depuis dtstart, une fréquence plus fine les rendrait interminables.
+ALLOWED_FREQUENCIES = ("YEARLY", "MONTHLY", "WEEKLY", "DAILY", "HOURLY")
+MIN_OCCURRENCE_SPACING = timedelta(hours=1)
+SPACING_CHECKED_OCCURRENCES = 100
+
+_UNTIL = re.compile(r"UNTIL=(\d{8})(?:T(\d{6}))?(Z?)", re.IGNORECASE)
+_FREQ = re.compile(r"(?:^|[;:])FREQ=(\w+)", re.IGNORECASE)
+
+# Les dates sont stockées en UTC naïf, mais la règle s'applique à l'heure locale de la série (tzid) :
+# "BYHOUR=9" reste 9 h locales après un changement d'heure. On développe la règle sur un dtstart
+# local, puis chaque occurrence est reconvertie en UTC naïf.
+
+def _to_local(value: datetime, zone: ZoneInfo) -> datetime:
+    return value.replace(tzinfo=timezone.utc).astimezone(zone)
+
+def _to_utc(value: datetime) -> datetime:
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+def _parse_rule(rule: str, dtstart: datetime, zone: ZoneInfo):
+    # On accepte "FREQ=WEEKLY;BYDAY=MO" comme "RRULE:FREQ=WEEKLY;BYDAY=MO"
+    if rule.upper().startswith("RRULE:"):
+        rule = rule[len("RRULE:"):]
+
+    # Avec un dtstart local, dateutil exige un UNTIL en UTC : un UNTIL sans "Z" est une heure locale
+    def until_in_utc(match) -> str:
+        if match.group(3):
+            return match.group(0)
+        until = datetime.strptime(match.group(1) + (match.group(2) or "235959"), "%Y%m%d%H%M%S")
+        return f"UNTIL={_to_utc(until.replace(tzinfo=zone)):%Y%m%dT%H%M%S}Z"
+
+    rule = _UNTIL.sub(until_in_utc, rule)
+    # Occurrences à la minute près : les secondes de dtstart ne sont pas reportées sur chaque occurrence
+    return rrulestr(rule, dtstart=_to_local(dtstart.replace(second=0, microsecond=0), zone))
+
+def validate_rrule(rule: str, dtstart: datetime, tzid: str = "UTC") -> Optional[str]:
+    """Retourne un message d'erreur si la règle (ou le fuseau horaire) est invalide, None sinon."""
+    try:
+        zone = ZoneInfo(tzid)
+    except (ZoneInfoNotFoundError, ValueError):
+        return f"Fuseau horaire inconnu : {tzid}"
+    try:
+        parsed = _parse_rule(rule, dtstart, zone)
+    except (ValueError, TypeError) as e:
+        return f"Règle de récurrence invalide : {e}"
+    freq = _FREQ.search(rule)
+    if freq and freq.group(1).upper() not in ALLOWED_FREQUENCIES:
+        return f"Fréquence {freq.group(1).upper()} non autorisée (au plus une occurrence par heure)."
+    # BYMINUTE / BYSECOND peuvent multiplier les occurrences d'une fréquence autorisée
+    first = [_to_utc(occurrence) for occurrence in islice(parsed, SPACING_CHECKED_OCCURRENCES)]
+    if any(b - a < MIN_OCCURRENCE_SPACING for a, b in zip(first, first[1:])):
+        return "Règle de récurrence invalide : les occurrences doivent être espacées d'au moins une heure."
+    return None
+
+def next_occurrence(rule: str, dtstart: datetime, after: datetime, inclusive: bool = False, tzid: str = "UTC") -> Optional[datetime]:
+    """Première occurrence après `after` (UTC naïf), ou None si la série est terminée."""
+    zone = ZoneInfo(tzid)
+    occurrence = _parse_rule(rule, dtstart, zone).after(_to_local(after, zone), inc=inclusive)
+    return _to_utc(occurrence) if occurrence else None
+
+def upcoming_occurrences(rule: str, dtstart: datetime, after: datetime, limit: int, tzid: str = "UTC") -> list[datetime]:
+    """Les `limit` prochaines occurrences à partir de `after` (inclus), calculées à la volée."""
+    zone = ZoneInfo(tzid)
+    limit = min(limit, MAX_LISTED_OCCURRENCES)
+    return [_to_utc(o) for o in _parse_rule(rule, dtstart, zone).xafter(_to_local(after, zone), count=limit, inc=True)]
+
+def occurrences_between(rule: str, dtstart: datetime, start: datetime, end: datetime, tzid: str = "UTC") -> list[datetime]:
+    """Occurrences comprises dans [start, end], plafonnées à MAX_LISTED_OCCURRENCES."""
+    zone = ZoneInfo(tzid)
+    occurrences = []
+    for occurrence in _parse_rule(rule, dtstart, zone).xafter(_to_local(start, zone), inc=True):
+        occurrence = _to_utc(occurrence)
+        if occurrence > end or len(occurrences) >= MAX_LISTED_OCCURRENCES:
+            break
+        occurrences.append(occurrence)
+    return occurrences
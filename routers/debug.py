@@ -0,0 +1,32 @@
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import PlainTextResponse
+from typing import Optional
+
+from profiling import token_matches, list_profiles, get_profile
+
+# Monté uniquement si PROFILING_ENABLED (main.py)
+
+def require_profiling_token(x_profile_token: Optional[str] = Header(None)):
+    if not token_matches(x_profile_token):
+        raise HTTPException(status_code=403, detail="Invalid profiling token")
+
+router = APIRouter(prefix="/debug", tags=["debug"], dependencies=[Depends(require_profiling_token)])
+
+@router.get("/profiles")
+def read_profiles():
+    return list_profiles()
+
+@router.get("/profiles/{profile_id}")
+def read_profile(profile_id: int):
+    profile = get_profile(profile_id)
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return profile
+
+@router.get("/profiles/{profile_id}/folded", response_class=PlainTextResponse)
+def read_profile_folded(profile_id: int):
+    """Piles au format "folded" : flamegraph.pl profil.folded > profil.svg, ou import dans speedscope."""
+    profile = get_profile(profile_id)
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return profile["folded"]
@@ -1,46 +1,318 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Header, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+import asyncio
+import codecs
+import json
 import io
-from sqlmodel import Session, select
-from typing import List, Optional
-from datetime import datetime
+import queue
+from sqlmodel import Session, select, update, delete, func
+from sqlmodel.ext.asyncio.session import AsyncSession
+from typing import Dict, List, Optional
+from datetime import datetime, timezone
+import heapq
+from pydantic import BaseModel, TypeAdapter
 
-from database import get_session
-from models import Post, User
-from auth import get_current_user
-from image_utils import combine_and_resize_images, upload_image_to_cloudinary
-from scheduler_service import schedule_new_post, remove_scheduled_post, send_post_now_manual, reschedule_post
+from database import get_session, get_async_session, async_session_factory
+from models import Post, PostGroup, PostSeries, ArchivedPost, User
+from auth import get_current_user, get_current_user_for_stream, get_current_user_streaming
+from config import settings
+from events import event_bus
+from image_utils import (
+    combine_and_resize_images, upload_image_to_cloudinary, render_platform_variants, upload_platform_variants,
+    ImageMemoryBudgetExceeded,
+)
+from scheduler_service import (
+    API_CLIENTS, schedule_new_post, schedule_due_posts, remove_scheduled_post, send_post_now_manual, reschedule_post,
+    schedule_new_group, remove_scheduled_group, send_group_now_manual, group_status,
+    schedule_series, remove_scheduled_series, send_series_occurrence_manual,
+    dispatch_due_posts, recover_stale_claims,
+)
+from idempotency import run_idempotent, run_idempotent_async
+from archival import archive_horizon
+from search import search_posts
+from post_transfer import export_query, format_rows, iter_queued_lines, import_posts
+from recurrence import validate_rrule, next_occurrence, upcoming_occurrences, occurrences_between
 
 router = APIRouter(prefix="/posts", tags=["posts"])
 
+class PostGroupCreate(BaseModel):
+    title: Optional[str] = None
+    text_content: str
+    scheduled_at: datetime
+    platforms: List[str]
+    image_url: Optional[str] = None  # Image commune à toutes les plateformes
+    image_urls: Dict[str, str] = {}  # Rendus par plateforme (issus de /posts/groups/upload)
+
+class PostSeriesCreate(BaseModel):
+    platform: str = "linkedin"
+    title: Optional[str] = None
+    text_content: str
+    image_url: Optional[str] = None
+    rrule: str
+    dtstart: datetime
+    tzid: str = "UTC"
+
+class PostSeriesUpdate(BaseModel):
+    platform: Optional[str] = None
+    title: Optional[str] = None
+    text_content: Optional[str] = None
+    image_url: Optional[str] = None
+    rrule: Optional[str] = None
+    dtstart: Optional[datetime] = None
+    tzid: Optional[str] = None
+    status: Optional[str] = None  # active, paused
+
+def _as_utc(value) -> datetime:
+    """
+    Normalise une date reçue en datetime UTC naïf (convention de la base).
+    Les modèles table (Post) ne valident pas le corps : la date y reste une chaîne ISO,
+    que les drivers asynchrones (asyncpg, aiosqlite) refusent.
+    """
+    value = TypeAdapter(datetime).validate_python(value)
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+def _memory_budget_error(e: ImageMemoryBudgetExceeded) -> HTTPException:
+    if e.retryable:
+        return HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "10"})
+    return HTTPException(status_code=413, detail=str(e))
+
+# Note: les appels au scheduler (add_job, remove_job...) écrivent dans le JobStore SQLAlchemy synchrone :
+# depuis une route async, ils passent par run_in_threadpool pour ne pas bloquer la boucle.
+# De même pour les calculs de récurrence (dateutil parcourt la règle depuis dtstart).
+
+async def _get_user_group(group_id: int, current_user: User, session: AsyncSession) -> PostGroup:
+    group = await session.get(PostGroup, group_id)
+    if not group or group.user_id != current_user.id:
+        raise HTTPException(status_code=404, detail="Group not found")
+    return group
+
+async def _group_response(group: PostGroup, session: AsyncSession) -> dict:
+    posts = (await session.exec(select(Post).where(Post.group_id == group.id, Post.user_id == group.user_id))).all()
+    if group.scheduled_at < archive_horizon():
+        posts += (await session.exec(
+            select(ArchivedPost).where(ArchivedPost.group_id == group.id, ArchivedPost.user_id == group.user_id)
+        )).all()
+    return {"group": group, "posts": posts}
+
+async def _release_group_member(group_id: int, session: AsyncSession) -> bool:
+    """
+    À appeler quand un post quitte son groupe (suppression, reprogrammation individuelle).
+    Un groupe vidé est supprimé ; sinon son statut est recalculé. Renvoie True si le job du groupe
+    doit être retiré, ce que l'appelant fait après le commit (sous SQLite, le JobStore écrit dans
+    le même fichier, verrouillé par la transaction en cours).
+    """
+    group = await session.get(PostGroup, group_id)
+    if group is None:
+        return False
+    statuses = (await session.exec(
+        select(Post.status).where(Post.group_id == group.id, Post.user_id == group.user_id)
+    )).all()
+    statuses += (await session.exec(
+        select(ArchivedPost.status).where(ArchivedPost.group_id == group.id, ArchivedPost.user_id == group.user_id)
+    )).all()
+    if not statuses:
+        await session.delete(group)
+        return True
+    group.status = group_status(statuses)
+    session.add(group)
+    return group.status != 'scheduled'
+
+def _history_filters(model, user_id: int, platform: Optional[str], start: Optional[datetime], end: Optional[datetime]) -> list:
+    """Filtres communs à la table posts et à posts_archive."""
+    conditions = [model.user_id == user_id]
+    if platform:
+        conditions.append(model.platform == platform)
+    if start:
+        conditions.append(model.scheduled_at >= start)
+    if end:
+        conditions.append(model.scheduled_at < end)
+    return conditions
+
 @router.get("/", response_model=List[Post])
-def read_posts(
+async def read_posts(
     skip: int = 0, 
     limit: int = 100, 
     platform: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
     current_user: User = Depends(get_current_user),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
-    query = select(Post).where(Post.user_id == current_user.id)
-    if platform:
-        query = query.where(Post.platform == platform)
-    query = query.order_by(Post.scheduled_at.desc()).offset(skip).limit(limit)
-    return session.exec(query).all()
+    start = _as_utc(start) if start else None
+    end = _as_utc(end) if end else None
+
+    hot_query = select(Post).where(*_history_filters(Post, current_user.id, platform, start, end)).order_by(Post.scheduled_at.desc())
+    posts = (await session.exec(hot_query.offset(skip).limit(limit))).all()
+
+    # L'archive n'est lue que si la page peut contenir des posts plus anciens que l'horizon d'archivage
+    horizon = archive_horizon()
+    if (start is not None and start >= horizon) or (len(posts) == limit and posts[-1].scheduled_at >= horizon):
+        return posts
+
+    # Fusion des deux tables triées : les `skip + limit` plus récents de chacune suffisent
+    window = skip + limit
+    if skip:
+        posts = (await session.exec(hot_query.limit(window))).all()
+    archived = (await session.exec(
+        select(ArchivedPost)
+        .where(*_history_filters(ArchivedPost, current_user.id, platform, start, end))
+        .order_by(ArchivedPost.scheduled_at.desc())
+        .limit(window)
+    )).all()
+    merged = heapq.merge(posts, archived, key=lambda post: post.scheduled_at, reverse=True)
+    return list(merged)[skip:window]
+
+@router.get("/events")
+async def stream_post_events(
+    last_event_id: Optional[str] = Header(None),
+    current_user: User = Depends(get_current_user_for_stream)
+):
+    """
+    Flux Server-Sent Events des changements de statut des posts et groupes de l'utilisateur.
+    Battement (commentaire SSE) toutes les EVENTS_HEARTBEAT_SECONDS ; reprise via l'en-tête Last-Event-ID.
+    """
+    user_id = current_user.id
+    resume_from = int(last_event_id) if last_event_id and last_event_id.isdigit() else None
+
+    async def _stream():
+        async with event_bus.subscribe(user_id, resume_from) as queue:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=settings.EVENTS_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": heartbeat\n\n"
+                    continue
+                if event is None:
+                    # Abonné trop lent : le navigateur se reconnecte et reprend depuis son dernier id
+                    return
+                yield f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event['data'], default=str)}\n\n"
+
+    return StreamingResponse(
+        _stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.get("/export")
+async def export_posts(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    current_user: User = Depends(get_current_user_streaming)
+):
+    """Export de tous les posts (y compris archivés), lu par curseur côté serveur et envoyé au fil de l'eau."""
+    user_id = current_user.id
+
+    async def _stream():
+        # Session propre au flux, rendue au pool dès la fin du flux (téléchargement terminé ou interrompu)
+        session = async_session_factory()
+        try:
+            result = await session.stream(export_query(user_id).execution_options(yield_per=settings.EXPORT_CHUNK_SIZE))
+            header = format == "csv"
+            async for rows in result.partitions():
+                yield format_rows(rows, format, header=header)
+                header = False
+            if header:
+                yield format_rows([], format, header=True)
+        finally:
+            await session.close()
+
+    filename = f"posts-{datetime.utcnow():%Y%m%d}.{format}"
+    return StreamingResponse(
+        _stream(),
+        media_type="application/x-ndjson" if format == "ndjson" else "text/csv",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+@router.post("/import")
+async def import_user_posts(
+    request: Request,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Import NDJSON ou CSV (colonnes de /posts/export). Le corps est lu par morceaux et transmis ligne
+    à ligne à un thread qui insère et programme les posts par paquets de IMPORT_CHUNK_SIZE.
+    """
+    user_id = current_user.id
+    chunks = queue.Queue(maxsize=8)
+
+    def _import():
+        lines = iter_queued_lines(chunks)
+        try:
+            return import_posts(lines, format, user_id, API_CLIENTS, schedule_due_posts)
+        finally:
+            # En cas d'erreur, la file est vidée : la lecture du corps ne reste pas bloquée
+            for _ in lines:
+                pass
+
+    worker = asyncio.ensure_future(run_in_threadpool(_import))
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    pending = ""
+    try:
+        async for data in request.stream():
+            # Découpage sur "\n" uniquement : les autres séparateurs Unicode peuvent figurer dans un texte
+            parts = (pending + decoder.decode(data)).split("\n")
+            pending = parts.pop()
+            if parts:
+                await run_in_threadpool(chunks.put, [part + "\n" for part in parts])
+        pending += decoder.decode(b"", final=True)
+        if pending:
+            await run_in_threadpool(chunks.put, [pending])
+    finally:
+        await run_in_threadpool(chunks.put, None)
+    return await worker
+
+@router.get("/search")
+async def search_user_posts(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_session)
+):
+    """Recherche plein texte dans le titre et le contenu, résultats les plus pertinents d'abord."""
+    try:
+        hits, next_cursor = await search_posts(session, current_user.id, q, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {
+        "results": [{**post.model_dump(), "rank": rank} for post, rank in hits],
+        "next_cursor": next_cursor,
+    }
 
 @router.post("/", response_model=Post)
-def create_post(
+async def create_post(
     post: Post, 
     current_user: User = Depends(get_current_user),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session),
+    idempotency_key: Optional[str] = Header(None)
 ):
-    post.user_id = current_user.id
-    session.add(post)
-    session.commit()
-    session.refresh(post)
-    
-    # Schedule the post
-    schedule_new_post(post.id, post.scheduled_at)
-    
-    return post
+    async def _create():
+        # Champs gérés par le serveur (appartenance, statut de publication) : jamais repris du corps
+        post.id = None
+        post.user_id = current_user.id
+        post.group_id = None
+        post.series_id = None
+        post.status = 'scheduled'
+        post.error_message = None
+        post.claimed_at = None
+        post.created_at = datetime.utcnow()
+        post.scheduled_at = _as_utc(post.scheduled_at)
+        session.add(post)
+        await session.commit()
+        await session.refresh(post)
+        
+        # Schedule the post
+        await run_in_threadpool(schedule_new_post, post.id, post.scheduled_at)
+        
+        return post
+
+    # Empreinte limitée aux champs fournis par le client (les autres sont fixés par le serveur)
+    body = {name: getattr(post, name) for name in ("platform", "title", "text_content", "image_url", "scheduled_at")}
+    return await run_idempotent_async(idempotency_key, f"user:{current_user.id}", "POST /posts/", _create, body)
 
 @router.post("/upload")
 async def upload_image(
@@ -62,27 +334,303 @@ async def upload_image(
     # Wait, I see in my previous thought I said "image_paths ici peuvent être des chemins locaux... ou des objets file-like".
     # But the code I wrote: `img = Image.open(path)` works with BytesIO too!
     
-    processed_image = combine_and_resize_images(image_data_list, platform)
+    # Traitement hors de la boucle asyncio : il peut attendre son admission dans le budget mémoire
+    encoding = {}
+    try:
+        processed_image = await run_in_threadpool(combine_and_resize_images, image_data_list, platform, encoding)
+    except ImageMemoryBudgetExceeded as e:
+        raise _memory_budget_error(e)
     
     if not processed_image:
         raise HTTPException(status_code=400, detail="Error processing images")
         
     # Upload to Cloudinary
-    image_url = upload_image_to_cloudinary(processed_image)
+    image_url = await run_in_threadpool(upload_image_to_cloudinary, processed_image)
     
     if not image_url:
         raise HTTPException(status_code=500, detail="Error uploading to Cloudinary")
         
-    return {"image_url": image_url}
+    return {"image_url": image_url, "encoding": encoding}
+
+@router.post("/groups/upload")
+async def upload_group_images(
+    files: List[UploadFile] = File(...),
+    platforms: str = Form(...),  # Liste séparée par des virgules : "linkedin,instagram,facebook"
+    current_user: User = Depends(get_current_user)
+):
+    platform_list = [p.strip() for p in platforms.split(",") if p.strip()]
+    if not platform_list:
+        raise HTTPException(status_code=400, detail="No platform given")
+
+    image_data_list = []
+    for file in files:
+        content = await file.read()
+        image_data_list.append(io.BytesIO(content))
+
+    # Un seul décodage des sources, un rendu par plateforme
+    encodings = {}
+    try:
+        variants = await run_in_threadpool(render_platform_variants, image_data_list, platform_list, encodings)
+    except ImageMemoryBudgetExceeded as e:
+        raise _memory_budget_error(e)
+    if not variants:
+        raise HTTPException(status_code=400, detail="Error processing images")
+
+    image_urls = await run_in_threadpool(upload_platform_variants, variants)
+    if not all(image_urls.values()):
+        raise HTTPException(status_code=500, detail="Error uploading to Cloudinary")
+
+    return {"image_urls": image_urls, "encodings": encodings}
+
+@router.post("/groups")
+async def create_post_group(
+    group_data: PostGroupCreate,
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_session),
+    idempotency_key: Optional[str] = Header(None)
+):
+    return await run_idempotent_async(
+        idempotency_key, f"user:{current_user.id}", "POST /posts/groups",
+        lambda: _create_post_group(group_data, current_user, session), group_data
+    )
+
+async def _create_post_group(group_data: PostGroupCreate, current_user: User, session: AsyncSession) -> dict:
+    group_data.scheduled_at = _as_utc(group_data.scheduled_at)
+    platforms = list(dict.fromkeys(group_data.platforms))  # Dédoublonne en gardant l'ordre
+    if not platforms:
+        raise HTTPException(status_code=400, detail="No platform given")
+    unsupported = [p for p in platforms if p not in API_CLIENTS]
+    if unsupported:
+        raise HTTPException(status_code=400, detail=f"Unsupported platform(s): {', '.join(unsupported)}")
+
+    group = PostGroup(
+        user_id=current_user.id,
+        title=group_data.title,
+        text_content=group_data.text_content,
+        scheduled_at=group_data.scheduled_at,
+    )
+    session.add(group)
+    await session.flush()
+
+    for platform in platforms:
+        session.add(Post(
+            user_id=current_user.id,
+            group_id=group.id,
+            platform=platform,
+            title=group_data.title,
+            text_content=group_data.text_content,
+            image_url=group_data.image_urls.get(platform, group_data.image_url),
+            scheduled_at=group_data.scheduled_at,
+        ))
+    await session.commit()
+    await session.refresh(group)
+
+    # Un seul job pour tout le groupe
+    await run_in_threadpool(schedule_new_group, group.id, group.scheduled_at)
+
+    return await _group_response(group, session)
+
+@router.get("/groups/{group_id}")
+async def read_post_group(
+    group_id: int,
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_session)
+):
+    group = await _get_user_group(group_id, current_user, session)
+    return await _group_response(group, session)
+
+@router.delete("/groups/{group_id}")
+async def delete_post_group(
+    group_id: int,
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_session)
+):
+    group = await _get_user_group(group_id, current_user, session)
+
+    await run_in_threadpool(remove_scheduled_group, group.id)
+    for post in (await session.exec(select(Post).where(Post.group_id == group.id, Post.user_id == group.user_id))).all():
+        await run_in_threadpool(remove_scheduled_post, post.id)
+        await session.delete(post)
+    await session.exec(delete(ArchivedPost).where(ArchivedPost.group_id == group.id, ArchivedPost.user_id == group.user_id))
+    await session.delete(group)
+    await session.commit()
+    return {"ok": True}
+
+@router.post("/groups/{group_id}/send-now")
+def send_group_now(
+    group_id: int,
+    current_user: User = Depends(get_current_user),
+    session: Session = Depends(get_session),
+    idempotency_key: Optional[str] = Header(None)
+):
+    def _send():
+        group = session.get(PostGroup, group_id)
+        if not group or group.user_id != current_user.id:
+            raise HTTPException(status_code=404, detail="Group not found")
+
+        success, message = send_group_now_manual(group.id, session)
+        session.refresh(group)
+        if not success and group.status == 'failed':
+            raise HTTPException(status_code=500, detail=message)
+
+        posts = session.exec(select(Post).where(Post.group_id == group.id, Post.user_id == group.user_id)).all()
+        return {"status": group.status, "message": message, "group": group, "posts": posts}
+
+    return run_idempotent(idempotency_key, f"user:{current_user.id}", f"POST /posts/groups/{group_id}/send-now", _send)
+
+async def _get_user_series(series_id: int, current_user: User, session: AsyncSession) -> PostSeries:
+    series = await session.get(PostSeries, series_id)
+    if not series or series.user_id != current_user.id:
+        raise HTTPException(status_code=404, detail="Series not found")
+    return series
+
+def _sync_series_job(series: PostSeries):
+    """Positionne (ou retire) l'unique job de la série selon son état."""
+    if series.status == 'active' and series.next_occurrence_at:
+        schedule_series(series.id, series.next_occurrence_at)
+    else:
+        remove_scheduled_series(series.id)
+
+@router.post("/series", response_model=PostSeries)
+async def create_post_series(
+    series_data: PostSeriesCreate,
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_session)
+):
+    if series_data.platform not in API_CLIENTS:
+        raise HTTPException(status_code=400, detail=f"Unsupported platform: {series_data.platform}")
+    series_data.dtstart = _as_utc(series_data.dtstart).replace(second=0, microsecond=0)
+    error = await run_in_threadpool(validate_rrule, series_data.rrule, series_data.dtstart, series_data.tzid)
+    if error:
+        raise HTTPException(status_code=400, detail=error)
+
+    series = PostSeries(user_id=current_user.id, **series_data.model_dump())
+    series.next_occurrence_at = await run_in_threadpool(
+        next_occurrence, series.rrule, series.dtstart, datetime.utcnow(), True, series.tzid
+    )
+    if series.next_occurrence_at is None:
+        series.status = 'ended'
+    session.add(series)
+    await session.commit()
+    await session.refresh(series)
+
+    await run_in_threadpool(_sync_series_job, series)
+    return series
+
+@router.get("/series", response_model=List[PostSeries])
+async def read_post_series(
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_session)
+):
+    query = select(PostSeries).where(PostSeries.user_id == current_user.id).order_by(PostSeries.created_at.desc())
+    return (await session.exec(query)).all()
+
+@router.get("/series/occurrences")
+async def read_series_occurrences_between(
+    start: datetime,
+    end: datetime,
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_session)
+):
+    """Occurrences futures de toutes les séries actives sur une période (calendrier), calculées à la volée."""
+    start, end = _as_utc(start), _as_utc(end)
+    query = select(PostSeries).where(
+        PostSeries.user_id == current_user.id,
+        PostSeries.status == 'active'
+    )
+    occurrences = []
+    for series in (await session.exec(query)).all():
+        # Les occurrences passées existent déjà en tant que Post
+        window_start = max(start, series.next_occurrence_at or end)
+        for occurrence_at in await run_in_threadpool(occurrences_between, series.rrule, series.dtstart, window_start, end, series.tzid):
+            occurrences.append({
+                "series_id": series.id,
+                "platform": series.platform,
+                "title": series.title,
+                "text_content": series.text_content,
+                "image_url": series.image_url,
+                "scheduled_at": occurrence_at,
+            })
+    occurrences.sort(key=lambda o: o["scheduled_at"])
+    return occurrences
+
+@router.get("/series/{series_id}/occurrences")
+async def read_series_occurrences(
+    series_id: int,
+    limit: int = 10,
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_session)
+):
+    series = await _get_user_series(series_id, current_user, session)
+    if series.status == 'ended' or not series.next_occurrence_at:
+        return []
+    return await run_in_threadpool(upcoming_occurrences, series.rrule, series.dtstart, series.next_occurrence_at, limit, series.tzid)
+
+@router.put("/series/{series_id}", response_model=PostSeries)
+async def update_post_series(
+    series_id: int,
+    series_update: PostSeriesUpdate,
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_session)
+):
+    series = await _get_user_series(series_id, current_user, session)
+    changes = series_update.model_dump(exclude_unset=True)
+    if changes.get("dtstart"):
+        changes["dtstart"] = _as_utc(changes["dtstart"]).replace(second=0, microsecond=0)
+
+    if "platform" in changes and changes["platform"] not in API_CLIENTS:
+        raise HTTPException(status_code=400, detail=f"Unsupported platform: {changes['platform']}")
+    if "status" in changes and changes["status"] not in ('active', 'paused'):
+        raise HTTPException(status_code=400, detail="Status must be 'active' or 'paused'")
+    rrule = changes.get("rrule", series.rrule)
+    dtstart = changes.get("dtstart", series.dtstart)
+    tzid = changes.get("tzid") or series.tzid
+    changes["tzid"] = tzid
+    error = await run_in_threadpool(validate_rrule, rrule, dtstart, tzid)
+    if error:
+        raise HTTPException(status_code=400, detail=error)
+
+    for field, value in changes.items():
+        setattr(series, field, value)
+
+    # Seule la prochaine occurrence est recalculée : aucune ligne de Post n'est touchée
+    series.next_occurrence_at = await run_in_threadpool(
+        next_occurrence, series.rrule, series.dtstart, datetime.utcnow(), True, series.tzid
+    )
+    if series.next_occurrence_at is None:
+        series.status = 'ended'
+
+    session.add(series)
+    await session.commit()
+    await session.refresh(series)
+
+    await run_in_threadpool(_sync_series_job, series)
+    return series
+
+@router.delete("/series/{series_id}")
+async def delete_post_series(
+    series_id: int,
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_session)
+):
+    series = await _get_user_series(series_id, current_user, session)
+
+    await run_in_threadpool(remove_scheduled_series, series.id)
+    # Les occurrences déjà publiées restent dans l'historique, détachées de la série
+    await session.exec(update(Post).where(Post.series_id == series.id).values(series_id=None))
+    await session.exec(update(ArchivedPost).where(ArchivedPost.series_id == series.id).values(series_id=None))
+    await session.delete(series)
+    await session.commit()
+    return {"ok": True}
 
 @router.put("/{post_id}", response_model=Post)
-def update_post(
+async def update_post(
     post_id: int, 
     post_update: Post, 
     current_user: User = Depends(get_current_user),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
-    post = session.get(Post, post_id)
+    post = await session.get(Post, post_id)
     if not post or post.user_id != current_user.id:
         raise HTTPException(status_code=404, detail="Post not found")
         
@@ -93,83 +641,155 @@ def update_post(
     post.platform = post_update.platform
     
     # Check if schedule changed
-    if post.scheduled_at != post_update.scheduled_at:
-        post.scheduled_at = post_update.scheduled_at
-        reschedule_post(post.id, post.scheduled_at)
+    new_scheduled_at = _as_utc(post_update.scheduled_at)
+    left_group, drop_group_job = None, False
+    if post.scheduled_at != new_scheduled_at:
+        post.scheduled_at = new_scheduled_at
+        # Un post reprogrammé individuellement quitte son groupe et reçoit son propre job
+        left_group, post.group_id = post.group_id, None
+        await run_in_threadpool(reschedule_post, post.id, post.scheduled_at)
+        session.add(post)
+        if left_group is not None:
+            drop_group_job = await _release_group_member(left_group, session)
         
     session.add(post)
-    session.commit()
-    session.refresh(post)
+    await session.commit()
+    if drop_group_job:
+        await run_in_threadpool(remove_scheduled_group, left_group)
+    await session.refresh(post)
     return post
 
 @router.delete("/{post_id}")
-def delete_post(
+async def delete_post(
     post_id: int, 
     current_user: User = Depends(get_current_user),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
-    post = session.get(Post, post_id)
+    post = await session.get(Post, post_id)
+    if post is None:
+        # Post ancien : déplacé dans l'archive (pas de job à supprimer)
+        post = await session.get(ArchivedPost, post_id)
     if not post or post.user_id != current_user.id:
         raise HTTPException(status_code=404, detail="Post not found")
         
-    remove_scheduled_post(post.id)
-    session.delete(post)
-    session.commit()
+    if isinstance(post, Post):
+        await run_in_threadpool(remove_scheduled_post, post.id)
+    await session.delete(post)
+    # La requête du recalcul déclenche l'autoflush : le post supprimé n'est plus compté
+    drop_group_job = post.group_id is not None and await _release_group_member(post.group_id, session)
+    await session.commit()
+    if drop_group_job:
+        await run_in_threadpool(remove_scheduled_group, post.group_id)
     return {"ok": True}
 
+# Routes d'envoi : synchrones (pool de threads), elles attendent la réponse du webhook
+# et partagent le code de publication du scheduler.
+
 @router.post("/{post_id}/send-now")
 def send_now(
     post_id: int, 
     current_user: User = Depends(get_current_user),
-    session: Session = Depends(get_session)
+    session: Session = Depends(get_session),
+    idempotency_key: Optional[str] = Header(None)
 ):
-    post = session.get(Post, post_id)
-    if not post or post.user_id != current_user.id:
-        raise HTTPException(status_code=404, detail="Post not found")
-        
-    success, message = send_post_now_manual(post.id, session)
-    if not success:
-        raise HTTPException(status_code=500, detail=message)
-        
-    return {"status": "published", "message": message}
+    def _send():
+        post = session.get(Post, post_id)
+        if not post or post.user_id != current_user.id:
+            raise HTTPException(status_code=404, detail="Post not found")
+            
+        success, message = send_post_now_manual(post.id, session)
+        if not success:
+            session.refresh(post)
+            if post.status in ('publishing', 'published'):
+                # Réservé par un autre envoi (job, rattrapage ou requête concurrente)
+                raise HTTPException(status_code=409, detail=message)
+            raise HTTPException(status_code=500, detail=message)
+            
+        return {"status": "published", "message": message}
+
+    return run_idempotent(idempotency_key, f"user:{current_user.id}", f"POST /posts/{post_id}/send-now", _send)
+
+@router.get("/next-due")
+async def read_next_due(
+    session: AsyncSession = Depends(get_async_session)
+):
+    """
+    Date de la prochaine publication due (post programmé ou occurrence de série).
+    Requête MIN servie par index, appelée par keep_alive.py pour planifier son prochain réveil.
+    """
+    now = datetime.utcnow()
+    next_post_at = (await session.exec(
+        select(func.min(Post.scheduled_at)).where(Post.status == 'scheduled')
+    )).one()
+    next_series_at = (await session.exec(
+        select(func.min(PostSeries.next_occurrence_at)).where(PostSeries.status == 'active')
+    )).one()
+
+    candidates = [d for d in (next_post_at, next_series_at) if d is not None]
+    next_due_at = min(candidates) if candidates else None
+
+    return {
+        "server_time": now.isoformat(),
+        "next_due_at": next_due_at.isoformat() if next_due_at else None,
+        "overdue": next_due_at is not None and next_due_at <= now,
+    }
 
 @router.post("/check-pending-posts")
 def check_pending_posts(
-    session: Session = Depends(get_session)
+    session: Session = Depends(get_session),
+    idempotency_key: Optional[str] = Header(None)
 ):
+    return run_idempotent(
+        idempotency_key, "catch-up", "POST /posts/check-pending-posts",
+        lambda: _run_catch_up(session)
+    )
+
+def _run_catch_up(session: Session) -> dict:
     """
     Vérifie et publie tous les posts programmés dont la date est dépassée.
     Utilisé pour rattraper les publications manquées pendant le sommeil du serveur.
     IMPORTANT: Utilise UTC pour la cohérence avec les datetimes stockés en base.
     """
     now = datetime.utcnow()
-    
-    # Trouver tous les posts programmés dont la date est passée
-    query = select(Post).where(
-        Post.status == 'scheduled',
-        Post.scheduled_at <= now
-    )
-    pending_posts = session.exec(query).all()
-    
-    print(f"DEBUG CHECK_PENDING: {len(pending_posts)} posts trouvés pour rattrapage (Now UTC: {now})")
 
+    # Posts bloqués en 'publishing' après un arrêt pendant l'envoi
+    recover_stale_claims(session)
+
+    # Posts simples et posts de groupes : réservés, envoyés et enregistrés par lots
+    outcomes = dispatch_due_posts(session, now)
     
+    print(f"DEBUG CHECK_PENDING: {len(outcomes)} posts publiés par rattrapage (Now UTC: {now})")
+
     published_count = 0
     failed_count = 0
     results = []
-    
-    for post in pending_posts:
-        success, message = send_post_now_manual(post.id, session)
+
+    for post_id, success, message in outcomes:
+        if success:
+            published_count += 1
+            results.append(f"✓ Post #{post_id} publié. {message}")
+        else:
+            failed_count += 1
+            results.append(f"✗ Post #{post_id} échec: {message}")
+
+    # Séries récurrentes dont l'occurrence est due
+    due_series = session.exec(select(PostSeries).where(
+        PostSeries.status == 'active',
+        PostSeries.next_occurrence_at <= now
+    )).all()
+
+    for series in due_series:
+        success, message = send_series_occurrence_manual(series.id, session)
         if success:
             published_count += 1
-            results.append(f"✓ Post #{post.id} publié. {message}")
+            results.append(f"✓ Série #{series.id} : occurrence publiée. {message}")
         else:
             failed_count += 1
-            results.append(f"✗ Post #{post.id} échec: {message}")
+            results.append(f"✗ Série #{series.id} : occurrence en échec: {message}")
     
     return {
         "checked_at": now.isoformat(),
-        "total_pending": len(pending_posts),
+        "total_pending": len(outcomes) + len(due_series),
         "published": published_count,
         "failed": failed_count,
         "details": results
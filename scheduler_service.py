@@ -1,9 +1,19 @@
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
-from sqlmodel import Session, select
+from sqlmodel import Session, select, update
 from database import engine, get_session
-from models import Post
-from datetime import datetime
+from models import Post, PostGroup, PostSeries
+from datetime import datetime, timedelta
+from typing import Optional
+from collections import defaultdict
+from sqlalchemy import or_
+from config import settings
+from recurrence import next_occurrence
+from idempotency import purge_expired_idempotency_keys
+from archival import archive_old_posts
+from events import publish_events, publish_post_statuses
+from preflight import PREFLIGHT_PREFIX, check_image, content_fingerprint, is_prepared, retain_prepared, store_payload, take_prepared_payload
+from concurrent.futures import ThreadPoolExecutor
 import linkedin_api
 import instagram_api
 import facebook_api
@@ -22,6 +32,129 @@ jobstores = {
 
 scheduler = BackgroundScheduler(jobstores=jobstores)
 
+def claim_post(post_id: int, session: Session, from_statuses: tuple = ('scheduled',)) -> bool:
+    """
+    Passe atomiquement le post à l'état 'publishing' s'il est dans un des états attendus.
+    Un seul appelant (job, envoi manuel, rattrapage) peut gagner : les autres ne doivent pas appeler le webhook.
+    """
+    result = session.exec(
+        update(Post)
+        .where(Post.id == post_id, Post.status.in_(from_statuses))
+        .values(status='publishing', claimed_at=datetime.utcnow())
+        .returning(Post.user_id)
+        .execution_options(synchronize_session=False)
+    )
+    user_id = result.scalar_one_or_none()
+    session.commit()
+    if user_id is None:
+        return False
+    publish_post_statuses([(user_id, post_id, 'publishing', None)])
+    return True
+
+def claim_posts(session: Session, *conditions, limit: Optional[int] = None) -> list[Post]:
+    """
+    Réserve en une seule requête (UPDATE ... RETURNING) les posts programmés qui vérifient `conditions`.
+    Deux appelants concurrents obtiennent des lots disjoints : la condition sur le statut est réévaluée par la DB.
+    """
+    candidates = select(Post.id).where(Post.status == 'scheduled', *conditions).order_by(Post.scheduled_at)
+    if limit:
+        candidates = candidates.limit(limit)
+    result = session.exec(
+        update(Post)
+        .where(Post.id.in_(candidates), Post.status == 'scheduled')
+        .values(status='publishing', claimed_at=datetime.utcnow())
+        .returning(Post.id)
+        .execution_options(synchronize_session=False)
+    )
+    claimed_ids = result.scalars().all()
+    session.commit()
+    if not claimed_ids:
+        return []
+    posts = session.exec(select(Post).where(Post.id.in_(claimed_ids)).order_by(Post.scheduled_at)).all()
+    publish_post_statuses([(post.user_id, post.id, 'publishing', None) for post in posts])
+    return posts
+
+def _record_outcomes(session: Session, results: list[tuple[Post, bool, str]]) -> list[tuple[int, bool, str]]:
+    """
+    Enregistre le résultat d'un lot d'envois : un UPDATE ... WHERE id IN (...) par couple (statut, erreur),
+    puis le statut des groupes concernés, le tout en un seul commit.
+    Retourne des tuples (post_id, succès, message) utilisables après le commit.
+    """
+    outcomes = [(post.id, success, message) for post, success, message in results]
+    group_ids = {post.group_id for post, _, _ in results if post.group_id}
+    transitions = [
+        (post.user_id, post.id, 'published' if success else 'failed', None if success else message)
+        for post, success, message in results
+    ]
+
+    batches = defaultdict(list)
+    for post_id, success, message in outcomes:
+        batches[('published', None) if success else ('failed', message)].append(post_id)
+    for (status, error_message), post_ids in batches.items():
+        # Une publication réussie efface l'erreur précédente (échec, avertissement de pré-vérification)
+        values = {'status': status, 'error_message': error_message}
+        session.exec(
+            update(Post)
+            .where(Post.id.in_(post_ids))
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+
+    group_transitions = []
+    for group_id in group_ids:
+        group = session.get(PostGroup, group_id)
+        if group:
+            _refresh_group_status(group, session)
+            group_transitions.append((group.user_id, group.id, group.status))
+    session.commit()
+    publish_post_statuses(transitions, group_transitions)
+    return outcomes
+
+def recover_stale_claims(session: Session) -> int:
+    """
+    Passe en 'failed' les posts restés 'publishing' au-delà du délai (arrêt du serveur pendant l'envoi).
+    On ne sait pas si le webhook a été appelé : ils ne sont pas renvoyés automatiquement.
+    """
+    cutoff = datetime.utcnow() - timedelta(minutes=settings.PUBLISH_CLAIM_TIMEOUT_MINUTES)
+    error_message = "Publication interrompue (redémarrage du serveur) : vérifiez la plateforme avant de renvoyer."
+    result = session.exec(
+        update(Post)
+        .where(Post.status == 'publishing', or_(Post.claimed_at.is_(None), Post.claimed_at < cutoff))
+        .values(status='failed', error_message=error_message)
+        .returning(Post.id, Post.user_id, Post.group_id)
+        .execution_options(synchronize_session=False)
+    )
+    recovered = result.all()
+    group_transitions = []
+    for group_id in {row.group_id for row in recovered if row.group_id}:
+        group = session.get(PostGroup, group_id)
+        if group:
+            _refresh_group_status(group, session)
+            group_transitions.append((group.user_id, group.id, group.status))
+    session.commit()
+    if recovered:
+        print(f"Reprise : {len(recovered)} post(s) bloqué(s) en 'publishing' passé(s) en échec.")
+        publish_post_statuses([(row.user_id, row.id, 'failed', error_message) for row in recovered], group_transitions)
+    return len(recovered)
+
+def dispatch_due_posts(session: Session, now: Optional[datetime] = None) -> list[tuple[int, bool, str]]:
+    """
+    Publie tous les posts programmés dont la date est passée, par lots de DISPATCH_BATCH_SIZE :
+    réservation du lot en une requête, envois en parallèle, puis un seul commit pour les statuts.
+    En cas d'arrêt pendant un lot, ses posts restent 'publishing' (jamais renvoyés deux fois).
+    Retourne des tuples (post_id, succès, message).
+    """
+    now = now or datetime.utcnow()
+    outcomes = []
+    while True:
+        posts = claim_posts(session, Post.scheduled_at <= now, limit=settings.DISPATCH_BATCH_SIZE)
+        if not posts:
+            break
+        # Les jobs des posts du lot ne sont pas supprimés : s'ils se déclenchent, ils ne trouvent plus rien à réserver
+        results = _deliver_concurrently(posts, max_workers=settings.DISPATCH_CONCURRENCY)
+        outcomes.extend(_record_outcomes(session, results))
+    return outcomes
+
 def publish_post_task(post_id: int):
     print(f"Tâche déclenchée : Publication du post ID {post_id}")
     
@@ -33,45 +166,217 @@ def publish_post_task(post_id: int):
             print(f"Erreur : Post ID {post_id} non trouvé.")
             return
         if post.status != 'scheduled':
-            print(f"Avertissement : Le post ID {post_id} n'est pas à l'état 'scheduled'. Tâche ignorée.")
+            print(f"Avertissement : Le post ID {post_id} n'est pas à l'état 'scheduled' (déjà publié ou en cours). Tâche ignorée.")
             return
 
-        platform = post.platform
-        api_client = API_CLIENTS.get(platform)
+        # Les posts arrivant à échéance ensemble sont publiés par le premier job déclenché, en un seul lot
+        outcomes = dispatch_due_posts(session, max(datetime.utcnow(), post.scheduled_at))
+        published = sum(1 for _, success, _ in outcomes if success)
+        print(f"Post ID {post_id} : {len(outcomes)} post(s) traité(s) par lot, {published} publié(s).")
+
+def _preflight_post(post: Post) -> tuple[Optional[str], Optional[dict]]:
+    """Vérifie un post avant son échéance. Retourne (problème éventuel, payload prêt à envoyer)."""
+    api_client = API_CLIENTS.get(post.platform)
+    if not api_client:
+        return f"plateforme '{post.platform}' non supportée.", None
+    if not api_client.api.webhook_url:
+        return f"URL Webhook non configurée pour {post.platform}.", None
+    if not (post.text_content or "").strip():
+        return "le texte du post est vide.", None
+    if post.image_url:
+        problem = check_image(post.image_url)
+        if problem:
+            return problem, None
+    return None, api_client.build_payload(post.title, post.text_content, post.image_url)
 
-        if not api_client:
-            print(f"Erreur critique : Aucun client API trouvé pour la plateforme '{platform}'.")
-            post.status = 'failed'
-            post.error_message = f"Plateforme '{platform}' non supportée."
-            session.add(post)
-            session.commit()
+def preflight_due_posts():
+    """
+    Prépare les posts programmés dans les PREFLIGHT_LEAD_SECONDS à venir : validation, image sollicitée,
+    payload mis en cache et connexion au webhook ouverte. Un problème est signalé dans error_message
+    (le post reste programmé) et par un événement 'post.preflight'.
+    """
+    horizon = datetime.utcnow() + timedelta(seconds=settings.PREFLIGHT_LEAD_SECONDS)
+    with Session(engine) as session:
+        posts = session.exec(
+            select(Post).where(Post.status == 'scheduled', Post.scheduled_at <= horizon).order_by(Post.scheduled_at)
+        ).all()
+        retain_prepared({post.id for post in posts})
+        # Rouverte à chaque passage si le serveur a fermé la connexion inactive entre-temps
+        platforms = {post.platform for post in posts if post.platform in API_CLIENTS}
+        pending = []
+        for post in posts:
+            fingerprint = content_fingerprint(post.platform, post.title, post.text_content, post.image_url)
+            if not is_prepared(post.id, fingerprint):
+                pending.append((post, fingerprint))
+        if not pending:
+            for platform in platforms:
+                API_CLIENTS[platform].warm_up()
             return
 
-        try:
-            print(f"DEBUG SCHEDULER: Publication Post ID {post_id} sur {platform}. Image URL: {post.image_url}")
-            
-            # Passer le titre, le texte et l'image à la méthode post_update du bon client
-            success, message = api_client.post_update(
-                post.title, 
-                post.text_content, 
-                post.image_url # On utilise image_url maintenant
-            )
-            
-            if success:
-                post.status = 'published'
+        with ThreadPoolExecutor(max_workers=min(len(pending), settings.DISPATCH_CONCURRENCY)) as executor:
+            checks = list(executor.map(lambda item: _preflight_post(item[0]), pending))
+
+        events = []
+        for (post, fingerprint), (problem, payload) in zip(pending, checks):
+            error_message = PREFLIGHT_PREFIX + problem if problem else None
+            if problem is None:
+                store_payload(post.id, fingerprint, payload)
+                # Avertissement d'une vérification précédente, résolu depuis
+                changed = bool(post.error_message and post.error_message.startswith(PREFLIGHT_PREFIX))
             else:
-                post.status = 'failed'
-                post.error_message = message
-            
-            session.add(post)
-            session.commit()
-                
-        except Exception as e:
-            print(f"Erreur critique lors de la publication du post ID {post_id} sur {platform}: {e}")
-            post.status = 'failed'
-            post.error_message = str(e)
-            session.add(post)
-            session.commit()
+                # Un post en défaut est revérifié à chaque passage : on ne signale que les changements
+                changed = post.error_message != error_message
+            if changed:
+                # Le post a pu être réservé entre-temps : on ne touche qu'aux posts encore programmés
+                session.exec(
+                    update(Post)
+                    .where(Post.id == post.id, Post.status == 'scheduled')
+                    .values(error_message=error_message)
+                    .execution_options(synchronize_session=False)
+                )
+            if changed or problem is None:
+                events.append((post.user_id, "post.preflight", {"post_id": post.id, "ok": problem is None, "error_message": error_message}))
+        session.commit()
+
+    for platform in platforms:
+        API_CLIENTS[platform].warm_up()
+    publish_events(events)
+    problems = sum(1 for problem, _ in checks if problem)
+    print(f"Pré-vérification : {len(pending) - problems} post(s) prêt(s), {problems} problème(s) signalé(s).")
+
+def _deliver(platform: str, title, text, image_url, post_id: Optional[int] = None) -> tuple[bool, str]:
+    """
+    Appelle le webhook d'une plateforme. Ne touche pas à la DB (exécuté dans un thread).
+    Avec `post_id`, le payload préparé par la pré-vérification est envoyé tel quel s'il est à jour.
+    """
+    api_client = API_CLIENTS.get(platform)
+    if not api_client:
+        return False, f"Plateforme '{platform}' non supportée."
+    try:
+        payload = take_prepared_payload(post_id, platform, title, text, image_url) if post_id else None
+        if payload is not None:
+            return api_client.send_payload(payload)
+        return api_client.post_update(title, text, image_url)
+    except Exception as e:
+        print(f"Erreur critique lors de la publication sur {platform}: {e}")
+        return False, str(e)
+
+def _deliver_concurrently(posts: list[Post], max_workers: Optional[int] = None) -> list[tuple[Post, bool, str]]:
+    """Envoie les posts en parallèle (par défaut un thread par post)."""
+    if not posts:
+        return []
+    with ThreadPoolExecutor(max_workers=min(len(posts), max_workers or len(posts))) as executor:
+        futures = [
+            executor.submit(_deliver, post.platform, post.title, post.text_content, post.image_url, post.id)
+            for post in posts
+        ]
+        return [(post, *future.result()) for post, future in zip(posts, futures)]
+
+def group_status(statuses) -> str:
+    """Statut d'un groupe déduit du statut de chacun de ses posts."""
+    if not statuses or 'scheduled' in statuses:
+        return 'scheduled'
+    if 'publishing' in statuses:
+        return 'publishing'
+    if all(s == 'published' for s in statuses):
+        return 'published'
+    if all(s == 'failed' for s in statuses):
+        return 'failed'
+    return 'partial'
+
+def _refresh_group_status(group: PostGroup, session: Session):
+    """Calcule le statut du groupe à partir du statut de chacun de ses posts."""
+    statuses = session.exec(select(Post.status).where(Post.group_id == group.id, Post.user_id == group.user_id)).all()
+    group.status = group_status(statuses)
+    session.add(group)
+
+def _publish_group(group: PostGroup, session: Session) -> tuple[bool, str]:
+    """Publie tous les posts encore programmés du groupe et enregistre le statut de chaque plateforme."""
+    # Chaque plateforme est réservée : un envoi concurrent ne la publiera pas une 2e fois
+    posts = claim_posts(session, Post.group_id == group.id, Post.user_id == group.user_id)
+    results = _deliver_concurrently(posts)
+    details = [f"{post.platform}: {'OK' if success else message}" for post, success, message in results]
+    _record_outcomes(session, results)
+
+    success = bool(results) and all(success for _, success, _ in results)
+    return success, " | ".join(details) or "Aucun post programmé dans le groupe."
+
+def publish_group_task(group_id: int):
+    print(f"Tâche déclenchée : Publication du groupe ID {group_id}")
+
+    with Session(engine) as session:
+        group = session.get(PostGroup, group_id)
+
+        if not group:
+            print(f"Erreur : Groupe ID {group_id} non trouvé.")
+            return
+        if group.status != 'scheduled':
+            print(f"Avertissement : Le groupe ID {group_id} n'est pas à l'état 'scheduled'. Tâche ignorée.")
+            return
+
+        success, message = _publish_group(group, session)
+        print(f"Groupe ID {group_id} traité ({group.status}) : {message}")
+
+def _publish_series_occurrence(series: PostSeries, session: Session) -> tuple[bool, str]:
+    """
+    Publie l'occurrence due d'une série : avance la série à l'occurrence suivante et crée
+    le Post correspondant (historique) dans la même transaction, puis appelle le webhook.
+    """
+    occurrence_at = series.next_occurrence_at
+    # Occurrences manquées (serveur endormi) : on ne les rattrape pas une à une
+    after = max(occurrence_at, datetime.utcnow())
+    following_at = next_occurrence(series.rrule, series.dtstart, after, tzid=series.tzid)
+
+    # Réservation atomique de l'occurrence (compare-and-swap sur next_occurrence_at)
+    result = session.exec(
+        update(PostSeries)
+        .where(PostSeries.id == series.id, PostSeries.next_occurrence_at == occurrence_at)
+        .values(next_occurrence_at=following_at, status='active' if following_at else 'ended')
+    )
+    if result.rowcount != 1:
+        session.rollback()
+        return False, f"Occurrence du {occurrence_at} de la série ID {series.id} déjà publiée ou en cours."
+
+    post = Post(
+        user_id=series.user_id,
+        series_id=series.id,
+        platform=series.platform,
+        title=series.title,
+        text_content=series.text_content,
+        image_url=series.image_url,
+        scheduled_at=occurrence_at,
+        status='publishing',
+        claimed_at=datetime.utcnow(),
+    )
+    session.add(post)
+    session.commit()
+    session.refresh(series)
+    publish_post_statuses([(post.user_id, post.id, 'publishing', None)])
+
+    if following_at is None:
+        remove_scheduled_series(series.id)
+    else:
+        schedule_series(series.id, following_at)
+
+    success, message = _deliver(series.platform, series.title, series.text_content, series.image_url)
+    _record_outcomes(session, [(post, success, message)])
+    return success, message
+
+def publish_series_task(series_id: int):
+    print(f"Tâche déclenchée : Occurrence de la série ID {series_id}")
+
+    with Session(engine) as session:
+        series = session.get(PostSeries, series_id)
+
+        if not series:
+            print(f"Erreur : Série ID {series_id} non trouvée.")
+            return
+        if series.status != 'active' or not series.next_occurrence_at:
+            print(f"Avertissement : La série ID {series_id} n'est pas active. Tâche ignorée.")
+            return
+
+        success, message = _publish_series_occurrence(series, session)
+        print(f"Série ID {series_id} : occurrence {'publiée' if success else 'en échec'}, prochaine le {series.next_occurrence_at}")
 
 def schedule_new_post(post_id: int, scheduled_at: datetime):
     # On ajoute le job au scheduler
@@ -86,6 +391,52 @@ def schedule_new_post(post_id: int, scheduled_at: datetime):
     )
     print(f"Post ID {post_id} programmé pour {scheduled_at}")
 
+def _next_jobless_due_at(session: Session) -> Optional[datetime]:
+    """
+    Prochaine échéance d'un post programmé sans job propre (ni post_, ni group_) : les autres
+    sont publiés par leur job, la chaîne n'a pas à s'y arrêter. None quand il n'en reste plus.
+    """
+    job_ids = {job.id for job in scheduler.get_jobs()}
+    rows = session.exec(
+        select(Post.id, Post.group_id, Post.scheduled_at)
+        .where(Post.status == 'scheduled')
+        .order_by(Post.scheduled_at)
+        .execution_options(yield_per=500)
+    )
+    for post_id, group_id, scheduled_at in rows:
+        if f'post_{post_id}' not in job_ids and (group_id is None or f'group_{group_id}' not in job_ids):
+            return scheduled_at
+    return None
+
+def publish_due_posts_task():
+    """
+    Job partagé des posts programmés sans job individuel (import en masse) : publie tous les posts dus,
+    puis programme le même job à l'échéance suivante d'un post sans job ; la chaîne s'arrête ensuite.
+    """
+    with Session(engine) as session:
+        outcomes = dispatch_due_posts(session)
+        next_due_at = _next_jobless_due_at(session)
+    if outcomes:
+        published = sum(1 for _, success, _ in outcomes if success)
+        print(f"Échéance : {len(outcomes)} post(s) traité(s), {published} publié(s).")
+    if next_due_at:
+        schedule_due_posts(next_due_at)
+
+def schedule_due_posts(due_at: datetime):
+    """
+    Programme publish_due_posts_task à `due_at` (un job par échéance, quel que soit le nombre de posts).
+    Id propre à l'échéance : le job en cours d'exécution n'est retiré du JobStore qu'après son lancement.
+    """
+    scheduler.add_job(
+        publish_due_posts_task,
+        'date',
+        run_date=due_at,
+        id=f'due_{due_at:%Y%m%d%H%M%S%f}',
+        misfire_grace_time=None,  # Exécuté au réveil du serveur : la chaîne ne doit pas s'interrompre
+        coalesce=True,
+        replace_existing=True
+    )
+
 def remove_scheduled_post(post_id: int):
     job_id = f'post_{post_id}'
     if scheduler.get_job(job_id):
@@ -101,14 +452,84 @@ def reschedule_post(post_id: int, new_scheduled_at: datetime):
     else:
         schedule_new_post(post_id, new_scheduled_at)
 
+def schedule_new_group(group_id: int, scheduled_at: datetime):
+    scheduler.add_job(
+        publish_group_task,
+        'date',
+        run_date=scheduled_at,
+        args=[group_id],
+        id=f'group_{group_id}',
+        replace_existing=True
+    )
+    print(f"Groupe ID {group_id} programmé pour {scheduled_at}")
+
+def remove_scheduled_group(group_id: int):
+    job_id = f'group_{group_id}'
+    if scheduler.get_job(job_id):
+        scheduler.remove_job(job_id)
+        print(f"Tâche pour le groupe ID {group_id} supprimée du scheduler.")
+
+def schedule_series(series_id: int, next_occurrence_at: datetime):
+    """Un seul job par série, toujours positionné sur la prochaine occurrence."""
+    scheduler.add_job(
+        publish_series_task,
+        'date',
+        run_date=next_occurrence_at,
+        args=[series_id],
+        id=f'series_{series_id}',
+        replace_existing=True
+    )
+    print(f"Série ID {series_id} : prochaine occurrence programmée pour {next_occurrence_at}")
+
+def remove_scheduled_series(series_id: int):
+    job_id = f'series_{series_id}'
+    if scheduler.get_job(job_id):
+        scheduler.remove_job(job_id)
+        print(f"Tâche pour la série ID {series_id} supprimée du scheduler.")
+
 def start_scheduler():
     if not scheduler.running:
         scheduler.start()
         print("Scheduler démarré.")
+    # Nettoyage périodique des clés d'idempotence expirées
+    scheduler.add_job(
+        purge_expired_idempotency_keys,
+        'interval',
+        hours=1,
+        id='purge_idempotency_keys',
+        replace_existing=True
+    )
+    # Déplacement des anciens posts terminés vers posts_archive
+    if settings.ARCHIVE_AFTER_DAYS > 0:
+        scheduler.add_job(
+            archive_old_posts,
+            'interval',
+            hours=6,
+            id='archive_old_posts',
+            replace_existing=True
+        )
+    elif scheduler.get_job('archive_old_posts'):
+        scheduler.remove_job('archive_old_posts')
+    # Pré-vérification des posts à l'approche de leur échéance
+    if settings.PREFLIGHT_LEAD_SECONDS > 0:
+        scheduler.add_job(
+            preflight_due_posts,
+            'interval',
+            seconds=settings.PREFLIGHT_SCAN_SECONDS,
+            id='preflight_due_posts',
+            coalesce=True,
+            replace_existing=True
+        )
+    elif scheduler.get_job('preflight_due_posts'):
+        scheduler.remove_job('preflight_due_posts')
+    # Posts restés 'publishing' après un arrêt brutal pendant l'envoi
+    with Session(engine) as session:
+        recover_stale_claims(session)
 
-def send_post_now_manual(post_id: int, session: Session) -> tuple[bool, str]:
+def send_post_now_manual(post_id: int, session: Session, claimable_statuses: tuple = ('scheduled', 'failed')) -> tuple[bool, str]:
     """
     Force l'envoi immédiat d'un post.
+    Le post n'est envoyé que si sa réservation (-> 'publishing') réussit depuis un des `claimable_statuses`.
     Retourne un tuple (succès, message).
     """
     print(f"Envoi manuel forcé pour le post ID {post_id}")
@@ -117,40 +538,37 @@ def send_post_now_manual(post_id: int, session: Session) -> tuple[bool, str]:
     if not post:
         return False, f"Post ID {post_id} non trouvé."
 
-    platform = post.platform
-    api_client = API_CLIENTS.get(platform)
+    if not claim_post(post_id, session, claimable_statuses):
+        return False, f"Post ID {post_id} déjà publié ou en cours de publication."
+    remove_scheduled_post(post_id)
 
-    if not api_client:
-        post.status = 'failed'
-        post.error_message = f"Plateforme '{platform}' non supportée."
-        session.add(post)
-        session.commit()
-        return False, f"Aucun client API trouvé pour la plateforme '{platform}'."
+    success, message = _deliver(post.platform, post.title, post.text_content, post.image_url, post.id)
+    _record_outcomes(session, [(post, success, message)])
+    return success, message
 
-    try:
-        success, message = api_client.post_update(
-            post.title, 
-            post.text_content, 
-            post.image_url
-        )
-        
-        if success:
-            if post.status == 'scheduled':
-                remove_scheduled_post(post_id)
-            post.status = 'published'
-        else:
-            post.status = 'failed'
-            post.error_message = message
-        
-        session.add(post)
-        session.commit()
-        
-        return success, message
-            
-    except Exception as e:
-        print(f"Erreur critique lors de l'envoi manuel du post ID {post_id} sur {platform}: {e}")
-        post.status = 'failed'
-        post.error_message = str(e)
-        session.add(post)
-        session.commit()
-        return False, str(e)
+def send_group_now_manual(group_id: int, session: Session) -> tuple[bool, str]:
+    """
+    Force l'envoi immédiat de tous les posts programmés d'un groupe, en parallèle.
+    Retourne un tuple (succès, message).
+    """
+    print(f"Envoi manuel forcé pour le groupe ID {group_id}")
+    group = session.get(PostGroup, group_id)
+
+    if not group:
+        return False, f"Groupe ID {group_id} non trouvé."
+
+    remove_scheduled_group(group_id)
+    return _publish_group(group, session)
+
+def send_series_occurrence_manual(series_id: int, session: Session) -> tuple[bool, str]:
+    """
+    Publie immédiatement l'occurrence due d'une série (rattrapage).
+    Retourne un tuple (succès, message).
+    """
+    print(f"Envoi manuel de l'occurrence due pour la série ID {series_id}")
+    series = session.get(PostSeries, series_id)
+
+    if not series or series.status != 'active' or not series.next_occurrence_at:
+        return False, f"Série ID {series_id} non trouvée ou inactive."
+
+    return _publish_series_occurrence(series, session)
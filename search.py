@@ -0,0 +1,78 @@
+import base64
+import json
+import re
+from typing import Optional
+from sqlalchemy import text
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from config import settings
+from models import Post, ArchivedPost
+
+# Index créé par migrations._setup_full_text_search : tsvector + GIN sous Postgres, FTS5 sous SQLite.
+# Les résultats couvrent la table posts et posts_archive, triés par pertinence puis par id (décroissants).
+
+def encode_cursor(rank: float, post_id: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps([rank, post_id]).encode()).decode()
+
+def decode_cursor(cursor: str) -> tuple[float, int]:
+    """Lève ValueError si le curseur n'a pas été produit par encode_cursor."""
+    try:
+        rank, post_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return float(rank), int(post_id)
+    except Exception as e:
+        raise ValueError(f"Curseur invalide : {e}")
+
+def _fts5_query(q: str) -> str:
+    """Chaque mot devient une phrase FTS5 entre guillemets : la saisie ne peut pas casser la syntaxe MATCH."""
+    return " ".join(f'"{term}"' for term in re.findall(r"\w+", q))
+
+def _hits_sql(dialect: str) -> str:
+    if dialect == "postgresql":
+        language = re.sub(r"[^a-z_]", "", settings.SEARCH_LANGUAGE.lower())
+        ranked = " UNION ALL ".join(
+            f"SELECT id, ts_rank(search_vector, query) AS rank "
+            f"FROM {table}, websearch_to_tsquery('{language}', :q) AS query "
+            f"WHERE user_id = :user_id AND search_vector @@ query"
+            for table in ("posts", "posts_archive")
+        )
+        return f"SELECT id, rank FROM ({ranked}) AS hits"
+    # bm25 : plus petit = plus pertinent ; poids 0 pour user_id, le titre compte double
+    return (
+        "SELECT id, rank FROM ("
+        "SELECT rowid AS id, -bm25(posts_fts, 0.0, 2.0, 1.0) AS rank FROM posts_fts "
+        "WHERE posts_fts MATCH :q AND user_id = :user_id"
+        ") AS hits"
+    )
+
+async def search_posts(
+    session: AsyncSession, user_id: int, q: str, limit: int, cursor: Optional[str] = None
+) -> tuple[list[tuple[object, float]], Optional[str]]:
+    """
+    Recherche plein texte dans les posts (et l'archive) d'un utilisateur.
+    Retourne les couples (post, pertinence) de la page et le curseur de la page suivante (None si dernière page).
+    """
+    dialect = session.bind.dialect.name
+    if dialect == "sqlite":
+        q = _fts5_query(q)
+        if not q:
+            return [], None
+
+    sql = _hits_sql(dialect)
+    params = {"q": q, "user_id": user_id, "limit": limit + 1}
+    if cursor:
+        params["cursor_rank"], params["cursor_id"] = decode_cursor(cursor)
+        sql += " WHERE rank < :cursor_rank OR (rank = :cursor_rank AND id < :cursor_id)"
+    sql += " ORDER BY rank DESC, id DESC LIMIT :limit"
+
+    hits = (await session.exec(text(sql), params=params)).all()
+    next_cursor = encode_cursor(hits[limit - 1].rank, hits[limit - 1].id) if len(hits) > limit else None
+    hits = hits[:limit]
+
+    ids = [hit.id for hit in hits]
+    posts = {post.id: post for post in (await session.exec(select(Post).where(Post.id.in_(ids)))).all()}
+    missing = [post_id for post_id in ids if post_id not in posts]
+    if missing:
+        archived = (await session.exec(select(ArchivedPost).where(ArchivedPost.id.in_(missing)))).all()
+        posts.update({post.id: post for post in archived})
+
+    return [(posts[hit.id], hit.rank) for hit in hits if hit.id in posts], next_cursor
@@ -0,0 +1,118 @@
+"""
+Script de Test - Connexions DB des routes en streaming
+======================================================
+
+Vérifie que les flux longs (/posts/events en SSE, /posts/export) ne gardent pas
+de connexion du pool asynchrone pendant toute la durée de la réponse.
+
+Il va:
+1. Démarrer l'API sur une base SQLite temporaire (uvicorn dans un thread)
+2. Ouvrir plusieurs flux SSE et contrôler async_engine.pool.checkedout() == 0
+3. Lancer un export, contrôler qu'il n'utilise que sa propre connexion, puis 0 une fois terminé
+
+Usage:
+    python test_stream_connections.py
+    (ou via pytest)
+"""
+
+import os
+import socket
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+# ========== CONFIGURATION ==========
+SSE_STREAMS = 3
+EXPORTED_POSTS = 2000
+# ===================================
+
+_db_dir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'stream_test.db')}"
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ["EXPORT_CHUNK_SIZE"] = "100"
+
+import requests
+import uvicorn
+from sqlmodel import Session, select
+
+import main
+from database import engine, async_engine
+from models import Post, User
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def _start_server() -> tuple[uvicorn.Server, str]:
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(main.app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, f"http://127.0.0.1:{port}"
+
+def _wait_checked_out(expected: int, timeout: float = 2.0) -> int:
+    """Le pool est relâché au fil de la boucle asyncio du serveur : on laisse un court délai."""
+    deadline = time.time() + timeout
+    while async_engine.pool.checkedout() != expected and time.time() < deadline:
+        time.sleep(0.05)
+    return async_engine.pool.checkedout()
+
+def _login(base_url: str) -> str:
+    requests.post(f"{base_url}/auth/register", json={"email": "stream@test.local", "password": "pw"})
+    response = requests.post(f"{base_url}/auth/login", data={"username": "stream@test.local", "password": "pw"})
+    return response.json()["access_token"]
+
+def _seed_posts(email: str, count: int):
+    with Session(engine) as session:
+        user = session.exec(select(User).where(User.email == email)).one()
+        later = datetime.utcnow() + timedelta(days=1)
+        session.add_all(
+            Post(user_id=user.id, text_content=f"post {i}", scheduled_at=later, status="published")
+            for i in range(count)
+        )
+        session.commit()
+
+def test_streams_do_not_hold_pool_connections():
+    server, base_url = _start_server()
+    try:
+        token = _login(base_url)
+        _seed_posts("stream@test.local", EXPORTED_POSTS)
+
+        streams = []
+        for _ in range(SSE_STREAMS):
+            stream = requests.get(f"{base_url}/posts/events", params={"access_token": token}, stream=True, timeout=10)
+            assert stream.status_code == 200
+            assert next(stream.iter_lines()) == b"retry: 3000"
+            streams.append(stream)
+        checked_out = _wait_checked_out(0)
+        print(f"{SSE_STREAMS} flux SSE ouverts : {checked_out} connexion(s) du pool utilisée(s)")
+        assert checked_out == 0
+
+        export = requests.get(
+            f"{base_url}/posts/export", headers={"Authorization": f"Bearer {token}"}, stream=True, timeout=10
+        )
+        assert export.status_code == 200
+        chunks = export.iter_content(chunk_size=1024)
+        first_chunk = next(chunks)
+        during_export = async_engine.pool.checkedout()
+        print(f"Export en cours : {during_export} connexion(s) du pool utilisée(s)")
+        assert during_export <= 1  # Uniquement la session propre au flux d'export
+        lines = first_chunk.count(b"\n") + sum(chunk.count(b"\n") for chunk in chunks)
+        export.close()
+        assert lines >= EXPORTED_POSTS
+
+        checked_out = _wait_checked_out(0)
+        print(f"Export terminé, flux SSE toujours ouverts : {checked_out} connexion(s) du pool utilisée(s)")
+        assert checked_out == 0
+
+        for stream in streams:
+            stream.close()
+    finally:
+        server.should_exit = True
+
+if __name__ == "__main__":
+    test_streams_do_not_hold_pool_connections()
+    print("OK")